@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks for parser.py
+
+python bench.py drivers [--size-mb 50] [--repeat 5]
+python bench.py strings [--size-kb 200] [--repeat 5]
+python bench.py select [--size-mb 5] [--repeat 3]
+python bench.py file [--size-mb 20]
+python bench.py objects [--records 1000000]
+python bench.py dumps [--size-mb 5] [--repeat 3]
+python bench.py cache [--repeat 1000]
+python bench.py lazy [--size-mb 5] [--repeat 3]
+python bench.py stream [--size-mb 5]
+python bench.py schema [--records 100000] [--repeat 3]
+python bench.py parallel [--records 1000000] [--workers 1,2,4,8]
+python bench.py edit [--size-mb 10] [--repeat 100]
+python bench.py many [--documents 1000000]
+python bench.py import [--repeat 10]
+python bench.py suite [--size-kb 500] [--repeat 20] [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import sys
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from parser import JSONParser, ParseCache, Schema, dumps, parse_stream
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_EXAMPLE = os.path.join(ROOT, 'examples', 'json_schema.json')
+UNICODE_EXAMPLE = os.path.join(ROOT, 'examples', 'unicode.json')
+LARK_PARSER = os.path.join(ROOT, 'lark-json-parser', 'parser.py')
+
+
+def synthetic_document(size_bytes: int, seed: int = 0) -> str:
+    """Array of mixed records, roughly size_bytes long."""
+    rng = random.Random(seed)
+    records = []
+    total = 2
+    while total < size_bytes:
+        record = json.dumps({
+            "id": rng.randrange(1 << 32),
+            "name": f"user-{rng.randrange(1 << 20):x}",
+            "active": rng.random() < 0.5,
+            "score": round(rng.uniform(-1000, 1000), 3),
+            "tags": [f"tag{rng.randrange(100)}" for _ in range(rng.randrange(4))],
+            "parent": None,
+            "nested": {"depth": 1, "path": "a\\b\\\"c\""},
+        })
+        records.append(record)
+        total += len(record) + 2
+    return '[\n' + ',\n'.join(records) + '\n]'
+
+
+def long_string_document(size_bytes: int) -> str:
+    """One string without escapes."""
+    return '"' + ('lorem ipsum dolor sit amet ' * (size_bytes // 27 + 1))[:size_bytes] + '"'
+
+
+def escape_heavy_document(size_bytes: int) -> str:
+    """Array of strings where most characters are escapes, including surrogate pairs."""
+    item = '"tab\\t quote\\" \\u00e9\\u8A12 \\ud83d\\ude00 slash\\/ nl\\n"'
+    return '[' + ','.join([item] * (size_bytes // (len(item) + 1) + 1)) + ']'
+
+
+def records_document(size_bytes: int, seed: int = 0) -> str:
+    """{"items": [{"id": n, "payload": {...}}]} where each id is about 1% of its record."""
+    rng = random.Random(seed)
+    records = []
+    total = 12
+    while total < size_bytes:
+        payload = json.loads(synthetic_document(600, rng.randrange(1 << 32)))
+        record = json.dumps({"id": rng.randrange(1 << 16), "payload": payload})
+        records.append(record)
+        total += len(record) + 2
+    return '{"items": [' + ', '.join(records) + ']}'
+
+
+def homogeneous_records_document(count: int) -> str:
+    """Array of count records that all share the same keys."""
+    keys = ["id", "name", "email", "active", "score", "created_at", "country", "tags"]
+    records = []
+    for n in range(count):
+        values = [n, f"user{n}", f"user{n}@example.com", n % 2 == 0, n * 0.5, "2024-01-01T00:00:00Z", "NL", ["a", "b"]]
+        records.append(json.dumps(dict(zip(keys, values))))
+    return '[' + ','.join(records) + ']'
+
+
+def deep_nesting_document(depth: int) -> str:
+    """Arrays and objects nested depth levels deep."""
+    return '[{"a": ' * (depth // 2) + '1' + '}]' * (depth // 2)
+
+
+def wide_object_document(size_bytes: int) -> str:
+    """One object with many short members."""
+    members = []
+    total = 2
+    while total < size_bytes:
+        member = f'"key{len(members)}": {len(members)}'
+        members.append(member)
+        total += len(member) + 2
+    return '{' + ', '.join(members) + '}'
+
+
+def number_heavy_document(size_bytes: int, seed: int = 0) -> str:
+    """Flat array of integers and floats, like a metrics payload."""
+    rng = random.Random(seed)
+    numbers = []
+    total = 2
+    while total < size_bytes:
+        number = str(rng.randrange(-10**6, 10**6)) if rng.random() < 0.5 else repr(rng.uniform(-1e6, 1e6))
+        numbers.append(number)
+        total += len(number) + 1
+    return '[' + ','.join(numbers) + ']'
+
+
+def ndjson_document(size_bytes: int, seed: int = 0) -> str:
+    """One record per line."""
+    return '\n'.join(json.dumps(record) for record in json.loads(synthetic_document(size_bytes, seed))) + '\n'
+
+
+def best_time(parse, raw: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(raw)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_measured(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    seconds = time.perf_counter() - start
+    return seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_in_subprocess(function, *args):
+    """(seconds, peak RSS in MB) of function(*args) in a fresh interpreter."""
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(run_measured, (function, *args))
+
+
+def read_and_parse(path):
+    with open(path) as f:
+        JSONParser().parse(f.read())
+
+
+def parse_file(path):
+    JSONParser().parse_file(path)
+
+
+def load_lark_parser():
+    """parse function of lark-json-parser/parser.py, None when lark is not installed."""
+    if importlib.util.find_spec('lark') is None:
+        return None
+    spec = importlib.util.spec_from_file_location('lark_json_parser', LARK_PARSER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.parse
+
+
+def suite_parsers() -> dict:
+    parsers = {"parser.py": JSONParser().parse}
+    lark_parse = load_lark_parser()
+    if lark_parse is not None:
+        parsers["lark"] = lark_parse
+    parsers["json"] = json.loads
+    return parsers
+
+
+def suite_corpora(size_bytes: int) -> dict:
+    return {
+        "deep nesting": (deep_nesting_document(500), False),
+        "wide object": (wide_object_document(size_bytes), False),
+        "long strings": (long_string_document(size_bytes), False),
+        "number heavy": (number_heavy_document(size_bytes), False),
+        "escape heavy": (escape_heavy_document(size_bytes), False),
+        "records": (synthetic_document(size_bytes), False),
+        "ndjson": (ndjson_document(size_bytes), True),
+    }
+
+
+def measure_suite_case(parse, raw: str, lines: bool, repeat: int) -> dict:
+    """Throughput, p50/p99 latency and peak traced memory of parse on one corpus."""
+    documents = raw.splitlines() if lines else [raw]
+
+    def run():
+        return [parse(document) for document in documents]
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50 = statistics.median(latencies)
+    return {
+        "bytes": len(raw),
+        "mb_per_s": len(raw) / p50 / 1e6,
+        "p50_ms": p50 * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, round(0.99 * (len(latencies) - 1)))] * 1000,
+        "peak_memory_mb": peak / 1e6,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(name: str, label: str, seconds: float, size: int):
+    print(f"{name:<24} {label:<24} {seconds * 1000:>10.2f} ms {size / seconds / 1e6:>8.2f} MB/s")
+
+
+def bench_drivers(args):
+    documents = [(SCHEMA_EXAMPLE, open(SCHEMA_EXAMPLE).read(), args.repeat)]
+    if args.size_mb:
+        documents.append((f"synthetic {args.size_mb} MB", synthetic_document(args.size_mb * 1_000_000), 1))
+
+    drivers = [
+        ("table driver", lambda raw: JSONParser(driver='table').parse(raw)),
+        ("compiled driver", lambda raw: JSONParser(driver='compiled').parse(raw)),
+        ("index lexer", lambda raw: JSONParser(lexer='index').parse(raw)),
+    ]
+    for name, raw, repeat in documents:
+        for label, parse in drivers:
+            report(name, label, best_time(parse, raw, repeat), len(raw))
+
+
+def bench_strings(args):
+    size = args.size_kb * 1000
+    documents = [
+        ("long string", long_string_document(size)),
+        ("escape heavy", escape_heavy_document(size)),
+        (UNICODE_EXAMPLE, open(UNICODE_EXAMPLE).read()),
+    ]
+    parsers = [
+        ("char lexer", lambda raw: JSONParser(lexer='char').parse(raw)),
+        ("token lexer", lambda raw: JSONParser().parse(raw)),
+        ("builtin json", json.loads),
+    ]
+    for name, raw in documents:
+        for label, parse in parsers:
+            report(name, label, best_time(parse, raw, args.repeat), len(raw))
+
+
+def bench_select(args):
+    raw = records_document(args.size_mb * 1_000_000)
+    parsers = [
+        ("full parse", lambda raw: JSONParser().parse(raw)),
+        ("select $.items[*].id", lambda raw: JSONParser().parse(raw, select=['$.items[*].id'])),
+    ]
+    for label, parse in parsers:
+        report(f"records {args.size_mb} MB", label, best_time(parse, raw, args.repeat), len(raw))
+
+
+def bench_file(args):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        f.write(synthetic_document(args.size_mb * 1_000_000))
+    try:
+        size = os.path.getsize(f.name)
+        for label, function in [("read + parse", read_and_parse), ("parse_file (mmap)", parse_file)]:
+            seconds, peak_rss = measure_in_subprocess(function, f.name)
+            report(f"file {args.size_mb} MB", label, seconds, size)
+            print(f"{'':<24} {'':<24} {peak_rss:>10.1f} MB peak RSS")
+    finally:
+        os.unlink(f.name)
+
+
+def bench_objects(args):
+    raw = homogeneous_records_document(args.records)
+    parsers = [
+        ("parser.py", JSONParser().parse),
+        ("parser.py columnar", lambda raw: JSONParser().parse(raw, columnar=True)),
+        ("builtin json", json.loads),
+    ]
+    for label, parse in parsers:
+        report(f"{args.records} records", label, best_time(parse, raw, 1), len(raw))
+        # Timed apart, tracemalloc slows allocation down several times
+        tracemalloc.start()
+        value = parse(raw)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del value
+        print(f"{'':<24} {'':<24} {retained / 1e6:>10.1f} MB retained {peak / 1e6:>8.1f} MB peak")
+
+
+def bench_dumps(args):
+    documents = [
+        (f"synthetic {args.size_mb} MB", json.loads(synthetic_document(args.size_mb * 1_000_000))),
+        (f"escape heavy {args.size_mb} MB", json.loads(escape_heavy_document(args.size_mb * 1_000_000))),
+    ]
+    for name, value in documents:
+        for options in [{}, {'indent': 2}]:
+            suffix = ''.join(f" {key}={option}" for key, option in options.items())
+            size = len(json.dumps(value, **options))
+            report(name, "dumps" + suffix, best_time(lambda value: dumps(value, **options), value, args.repeat), size)
+            report(name, "builtin json" + suffix, best_time(lambda value: json.dumps(value, **options), value, args.repeat), size)
+
+
+def bench_cache(args):
+    raw = open(SCHEMA_EXAMPLE).read()
+    parsers = [
+        ("no cache", JSONParser()),
+        ("frozen cache", JSONParser(cache=ParseCache())),
+        ("copying cache", JSONParser(cache=ParseCache(frozen=False))),
+    ]
+    for label, parser in parsers:
+        def parse_repeatedly(raw):
+            for _ in range(args.repeat):
+                parser.parse(raw)
+        report(f"schema x {args.repeat}", label, best_time(parse_repeatedly, raw, 3), len(raw) * args.repeat)
+
+
+def bench_lazy(args):
+    raw = records_document(args.size_mb * 1_000_000)
+    parsers = [
+        ("full parse", lambda raw: JSONParser().parse(raw)['items'][0]['id']),
+        ("lazy first access", lambda raw: JSONParser().parse(raw, lazy=True)['items'][0]['id']),
+        ("lazy materialize", lambda raw: JSONParser().parse(raw, lazy=True).materialize()),
+    ]
+    for label, parse in parsers:
+        report(f"records {args.size_mb} MB", label, best_time(parse, raw, args.repeat), len(raw))
+
+
+async def serve_and_measure_lag(handle, body: bytes):
+    """Send body to a local server running handle(reader), returns (seconds, max event loop lag)."""
+    async def on_connection(reader, writer):
+        await handle(reader)
+        writer.close()
+
+    server = await asyncio.start_server(on_connection, '127.0.0.1', 0)
+    lag = 0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - start - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+    start = time.perf_counter()
+    writer.write(body)
+    writer.write_eof()
+    await reader.read()
+    seconds = time.perf_counter() - start
+    done = True
+    await tick
+    writer.close()
+    server.close()
+    return seconds, lag
+
+
+def bench_stream(args):
+    body = synthetic_document(args.size_mb * 1_000_000).encode()
+
+    async def blocking(reader):
+        JSONParser().parse((await reader.read()).decode())
+
+    handlers = [
+        ("parse after read", blocking),
+        ("parse_stream", parse_stream),
+        ("parse_stream offload", lambda reader: parse_stream(reader, offload_size=1 << 20)),
+    ]
+    for label, handle in handlers:
+        seconds, lag = asyncio.run(serve_and_measure_lag(handle, body))
+        report(f"synthetic {args.size_mb} MB", label, seconds, len(body))
+        print(f"{'':<24} {'':<24} {lag * 1000:>10.1f} ms max event loop lag")
+
+
+RECORD_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["id", "name", "email"],
+        "additionalProperties": False,
+        "properties": {
+            "id": {"type": "integer", "minimum": 0},
+            "name": {"type": "string", "pattern": "^user[0-9]+$"},
+            "email": {"type": "string", "maxLength": 64},
+            "active": {"type": "boolean"},
+            "score": {"type": "number", "minimum": 0},
+            "created_at": {"type": "string"},
+            "country": {"enum": ["NL", "BE", "DE"]},
+            "tags": {"type": "array", "items": {"type": "string"}},
+        },
+    },
+}
+
+
+def bench_schema(args):
+    raw = homogeneous_records_document(args.records)
+    schema = Schema(RECORD_SCHEMA)
+    parsers = [
+        ("parse", lambda raw: JSONParser().parse(raw)),
+        ("parse then validate", lambda raw: schema.validate(JSONParser().parse(raw))),
+        ("parse schema=", lambda raw: JSONParser().parse(raw, schema=schema)),
+    ]
+    # The first record breaks the schema, parse then validate only finds out at the end
+    invalid = raw.replace('"id": 0,', '"id": -1,', 1)
+
+    def failing(parse):
+        def run(raw):
+            try:
+                parse(raw)
+            except ValueError:
+                pass
+        return run
+
+    for label, parse in parsers:
+        report(f"{args.records} records", label, best_time(parse, raw, args.repeat), len(raw))
+    for label, parse in parsers[1:]:
+        report(f"{args.records} records, invalid", label, best_time(failing(parse), invalid, args.repeat), len(raw))
+
+
+def bench_parallel(args):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        f.write(homogeneous_records_document(args.records))
+    try:
+        size = os.path.getsize(f.name)
+        baseline = None
+        for workers in map(int, args.workers.split(',')):
+            start = time.perf_counter()
+            JSONParser().parse_parallel(f.name, workers=workers)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            report(f"{args.records} records", f"{workers} workers", seconds, size)
+            print(f"{'':<24} {'':<24} {baseline / seconds:>10.2f}x")
+    finally:
+        os.unlink(f.name)
+
+
+def bench_edit(args):
+    raw = records_document(args.size_mb * 1_000_000)
+    report(f"records {args.size_mb} MB", "full parse", best_time(JSONParser().parse, raw, 1), len(raw))
+    start = time.perf_counter()
+    document = JSONParser().editable(raw)
+    report(f"records {args.size_mb} MB", "editable", time.perf_counter() - start, len(raw))
+
+    middle = raw.index('"id": ', len(raw) // 2)
+    edits = [
+        ("one digit", raw.index(',', middle) - 1, 1, lambda n: str(n % 10)),
+        ("insert element", raw.index('"tags": [', middle) + 9, 0, lambda n: '"x", '),
+        ("rename key", middle + 1, 1, lambda n: 'ID'[n % 2]),
+    ]
+    for label, offset, deleted, inserted in edits:
+        start = time.perf_counter()
+        for n in range(args.repeat):
+            document.edit(offset, deleted, inserted(n))
+        seconds = (time.perf_counter() - start) / args.repeat
+        print(f"{f'records {args.size_mb} MB':<24} {label:<24} {seconds * 1000:>10.2f} ms per edit")
+
+
+def bench_many(args):
+    rng = random.Random(0)
+    documents = [rng.choice([
+        str(n),
+        f'"user-{n:x}"',
+        f'{{"id": {n}, "ok": true}}',
+        f'[{n}, null, "x"]',
+    ]) for n in range(args.documents)]
+    size = sum(map(len, documents))
+    parser = JSONParser()
+    context = parser.context()
+    parsers = [
+        ("JSONParser().parse", lambda: [JSONParser().parse(document) for document in documents]),
+        ("parse with a context", lambda: [parser.parse(document, context) for document in documents]),
+        ("parse_many", lambda: list(parser.parse_many(documents))),
+        ("json.loads", lambda: [json.loads(document) for document in documents]),
+    ]
+    for label, parse in parsers:
+        start = time.perf_counter()
+        parse()
+        seconds = time.perf_counter() - start
+        print(f"{f'{args.documents} documents':<24} {label:<24} {seconds / args.documents * 1e6:>10.2f} us per document "
+              f"{size / seconds / 1e6:>8.2f} MB/s")
+
+
+def bench_import(args):
+    # Each import runs in a fresh interpreter, timed inside it so interpreter startup is left out
+    imports = [
+        ("parser.py", "import parser", ""),
+        ("parser.py first parse", "import parser", "parser.JSONParser().parse('[1]')"),
+        ("lark-json-parser", "import importlib.util\n"
+                             f"spec = importlib.util.spec_from_file_location('lark_json_parser', {LARK_PARSER!r})\n"
+                             "module = importlib.util.module_from_spec(spec)\n"
+                             "spec.loader.exec_module(module)", ""),
+    ]
+    if importlib.util.find_spec('lark') is not None:
+        imports.append(("lark first parse", imports[-1][1], "module.parse('[1]')"))
+    for label, setup, first_use in imports:
+        code = f"import time\nstart = time.perf_counter()\n{setup}\n{first_use}\nprint(time.perf_counter() - start)"
+        times = [float(subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                                      check=True).stdout) for _ in range(args.repeat)]
+        print(f"{label:<24} {min(times) * 1000:>10.2f} ms best {statistics.median(times) * 1000:>10.2f} ms median")
+
+
+def bench_suite(args):
+    parsers = suite_parsers()
+    if "lark" not in parsers:
+        print("lark is not installed, skipping lark-json-parser")
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "size_kb": args.size_kb,
+        "repeat": args.repeat,
+        "results": {},
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+
+    print(f"{'corpus':<16} {'parser':<12} {'MB/s':>9} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9}")
+    for corpus, (raw, lines) in suite_corpora(args.size_kb * 1000).items():
+        for name, parse in parsers.items():
+            case = measure_suite_case(parse, raw, lines, args.repeat)
+            results["results"].setdefault(corpus, {})[name] = case
+            line = (f"{corpus:<16} {name:<12} {case['mb_per_s']:>9.2f} {case['p50_ms']:>10.2f} "
+                    f"{case['p99_ms']:>10.2f} {case['peak_memory_mb']:>9.2f}")
+            if previous and name in previous.get(corpus, {}):
+                line += f" {case['mb_per_s'] / previous[corpus][name]['mb_per_s'] - 1:>+8.1%} vs previous"
+            print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    drivers = commands.add_parser('drivers', help="table driver against the compiled driver")
+    drivers.add_argument('--size-mb', type=int, default=50, help="synthetic document size, 0 to skip")
+    drivers.add_argument('--repeat', type=int, default=5)
+    drivers.set_defaults(run=bench_drivers)
+
+    strings = commands.add_parser('strings', help="string decoding on long and escape heavy strings")
+    strings.add_argument('--size-kb', type=int, default=200)
+    strings.add_argument('--repeat', type=int, default=5)
+    strings.set_defaults(run=bench_strings)
+
+    select = commands.add_parser('select', help="full parse against selecting about 1% of a document")
+    select.add_argument('--size-mb', type=int, default=5)
+    select.add_argument('--repeat', type=int, default=3)
+    select.set_defaults(run=bench_select)
+
+    file = commands.add_parser('file', help="reading then parsing against parse_file, with peak RSS")
+    file.add_argument('--size-mb', type=int, default=20)
+    file.set_defaults(run=bench_file)
+
+    objects = commands.add_parser('objects', help="time and memory for an array of homogeneous records")
+    objects.add_argument('--records', type=int, default=1_000_000)
+    objects.set_defaults(run=bench_objects)
+
+    dumps_command = commands.add_parser('dumps', help="JSONEncoder against builtin json.dumps")
+    dumps_command.add_argument('--size-mb', type=int, default=5)
+    dumps_command.add_argument('--repeat', type=int, default=3)
+    dumps_command.set_defaults(run=bench_dumps)
+
+    cache = commands.add_parser('cache', help="repeated parses of the same schema with and without ParseCache")
+    cache.add_argument('--repeat', type=int, default=1000)
+    cache.set_defaults(run=bench_cache)
+
+    lazy = commands.add_parser('lazy', help="time to the first value with lazy=True against a full parse")
+    lazy.add_argument('--size-mb', type=int, default=5)
+    lazy.add_argument('--repeat', type=int, default=3)
+    lazy.set_defaults(run=bench_lazy)
+
+    stream = commands.add_parser('stream', help="event loop lag while a local asyncio server parses a large body")
+    stream.add_argument('--size-mb', type=int, default=5)
+    stream.set_defaults(run=bench_stream)
+
+    schema = commands.add_parser('schema', help="validating while parsing against validating the parsed tree")
+    schema.add_argument('--records', type=int, default=100_000)
+    schema.add_argument('--repeat', type=int, default=3)
+    schema.set_defaults(run=bench_schema)
+
+    parallel = commands.add_parser('parallel', help="parse_parallel wall clock by number of workers, on one large array")
+    parallel.add_argument('--records', type=int, default=1_000_000)
+    parallel.add_argument('--workers', default='1,2,4,8', help="comma separated worker counts")
+    parallel.set_defaults(run=bench_parallel)
+
+    edit = commands.add_parser('edit', help="EditableDocument.edit() against parsing the edited document again")
+    edit.add_argument('--size-mb', type=int, default=10)
+    edit.add_argument('--repeat', type=int, default=100)
+    edit.set_defaults(run=bench_edit)
+
+    many = commands.add_parser('many', help="per document overhead of parse() against parse_many() on tiny documents")
+    many.add_argument('--documents', type=int, default=1_000_000)
+    many.set_defaults(run=bench_many)
+
+    import_command = commands.add_parser('import', help="import time of parser.py and lark-json-parser, and to their first parse")
+    import_command.add_argument('--repeat', type=int, default=10)
+    import_command.set_defaults(run=bench_import)
+
+    suite = commands.add_parser('suite', help="parser.py, lark-json-parser and builtin json on synthetic corpora")
+    suite.add_argument('--size-kb', type=int, default=500, help="size of each corpus")
+    suite.add_argument('--repeat', type=int, default=20)
+    suite.add_argument('--output', help="write results as JSON")
+    suite.add_argument('--compare', help="results JSON of an earlier run to compare throughput with")
+    suite.set_defaults(run=bench_suite)
+
+    args = arg_parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import sys
-from lark import Lark, Transformer
 
 json_grammar = r"""
     ?value: dict
@@ -25,27 +24,40 @@ json_grammar = r"""
     %ignore WS
     """
 
-class TreeToJson(Transformer):
-    def string(self, s):
-        (s,) = s
-        return s[1:-1]
-    def number(self, n):
-        (n,) = n
-        return float(n)
+json_parser = None
 
-    list = list
-    pair = tuple
-    dict = dict
+def build_parser():
+    # lark is imported here rather than at the top, importing it takes longer than parsing
+    # a small document. cache=True keeps the LALR tables in a file in the temp directory,
+    # keyed by the grammar and the lark version, so only the first run builds them.
+    from lark import Lark, Transformer
 
-    null = lambda self, _: None
-    true = lambda self, _: True
-    false = lambda self, _: False
+    class TreeToJson(Transformer):
+        def string(self, s):
+            (s,) = s
+            return s[1:-1]
+        def number(self, n):
+            (n,) = n
+            return float(n)
 
-#json_parser = Lark(json_grammar, start='value', lexer='basic')
-json_parser = Lark(json_grammar, start='value', parser='lalr', transformer=TreeToJson())
+        list = list
+        pair = tuple
+        dict = dict
+
+        null = lambda self, _: None
+        true = lambda self, _: True
+        false = lambda self, _: False
+
+    return Lark(json_grammar, start='value', parser='lalr', transformer=TreeToJson(), cache=True)
+
+def parse(text):
+    global json_parser
+    if json_parser is None:
+        json_parser = build_parser()
+    return json_parser.parse(text)
 
 if __name__ == '__main__':
     with open(sys.argv[1]) as f:
-        # tree = json_parser.parse(f.read())
+        # tree = build_parser().parse(f.read())
         # print(TreeToJson().transform(tree))
-        print( json_parser.parse(f.read()) )
+        print( parse(f.read()) )
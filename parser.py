@@ -1,17 +1,42 @@
 #!/usr/bin/env python3
 
-from collections.abc import Generator
+from collections import Counter, OrderedDict
+from collections.abc import Generator, Mapping, Sequence
 from enum import Enum, auto
+from types import MappingProxyType
 from typing import Tuple
-import re
+from array import array
+from bisect import bisect_right
+from itertools import islice
 import codecs
+import json
+import mmap
+import numbers
+import os
+import re
 import logging
 import sys
+import threading
+import time
+
+# asyncio, multiprocessing and numpy take longer to import than this module, they are
+# imported where they are first needed. numpy is set by load_numpy().
+numpy = None
+numpy_loaded = False
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.CRITICAL)
-#logger.setLevel(logging.DEBUG)
+
+
+def load_numpy():
+    """numpy, imported on the first call, or None when it is not installed."""
+    global numpy, numpy_loaded
+    if not numpy_loaded:
+        try:
+            import numpy
+        except ImportError:
+            pass
+        numpy_loaded = True
+    return numpy
 
 
 class Term(Enum):
@@ -35,6 +60,8 @@ class Terminal(Term):
     ESCAPE_SPECIAL = auto()
     ESCAPE_HEX = auto()
     HEX = auto()
+    VALUE_STRING = auto()
+    ADD_VALUE = auto()
 
     def __str__(self):
         return f"T_{self.name}"
@@ -78,11 +105,912 @@ class NonTerminal(Rule):
     FALSE = auto()
     TRUE = auto()
     WS = auto()
+    STRING_TOKEN = auto()
+    NUMBER_TOKEN = auto()
+    BOOLEAN_TOKEN = auto()
+    NULL_TOKEN = auto()
+    KEY_TOKEN = auto()
 
     def __str__(self):
         return f"T_{self.name}"
 
 
+class CompiledTable():
+    """
+    JSONParser.table and JSONParser.rules flattened into integer indexed arrays for the token lexer.
+
+    Symbol ids are laid out as token classes, then value actions, then non terminals, so the
+    compiled driver can tell them apart with integer comparisons. rows[nonterminal][token class]
+    holds the rule expansion already reversed, ready for a single stack.extend.
+
+    The compiled lexers drop whitespace, so WS is left out of every expansion and the stack
+    only holds a few symbols per open container.
+    """
+    (NEW_LIST, NEW_OBJECT, END_STRING, END_KEY, END_NUMBER, END_OBJECT, END_ARRAY, END_VALUE,
+     ADD_ELEMENT, ADD_MEMBER) = range(10)
+
+    def __init__(self, table, rules):
+        # (symbol as used in rules, representative token used to look it up in the table)
+        token_classes = [(Terminal.END, (Terminal.END, None))]
+        token_classes += [((Terminal.CHAR, c), (Terminal.CHAR, c)) for c in '{}[]:, ']
+        token_classes += [(t, (t, None)) for t in (Terminal.VALUE_STRING, Terminal.VALUE_NUMBER,
+                                                   Terminal.VALUE_BOOLEAN, Terminal.VALUE_NULL)]
+        actions = sorted({symbol for expansion in rules.values() for symbol in expansion
+                          if isinstance(symbol, Tuple) and symbol[0] in (Terminal.NEW_VALUE, Terminal.VALUE_END, Terminal.ADD_VALUE)},
+                         key=str)
+
+        self.symbols = [symbol for symbol, _ in token_classes] + actions + list(NonTerminal)
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.first_action = len(token_classes)
+        self.first_rule = self.first_action + len(actions)
+        self.tokens = [token for _, token in token_classes]
+
+        self.END = self.ids[Terminal.END]
+        self.WS = self.ids[(Terminal.CHAR, ' ')]
+        self.VALUE_STRING = self.ids[Terminal.VALUE_STRING]
+        self.VALUE_NUMBER = self.ids[Terminal.VALUE_NUMBER]
+        self.VALUE_BOOLEAN = self.ids[Terminal.VALUE_BOOLEAN]
+        self.VALUE_NULL = self.ids[Terminal.VALUE_NULL]
+        self.start = [self.END, self.ids[NonTerminal.VALUE]]
+
+        self.structural = {c: (self.ids[(Terminal.CHAR, c)], c) for c in '{}[]:,'}
+        self.literals = {
+            't': ('true', (self.VALUE_BOOLEAN, True)),
+            'f': ('false', (self.VALUE_BOOLEAN, False)),
+            'n': ('null', (self.VALUE_NULL, None)),
+        }
+
+        self.actions = [None] * len(self.symbols)
+        for symbol in actions:
+            self.actions[self.ids[symbol]] = self.action_kind(symbol)
+
+        self.rows = [None] * len(self.symbols)
+        for nonterminal in NonTerminal:
+            row = [None] * len(token_classes)
+            for cls, token in enumerate(self.tokens):
+                entries = table.get(nonterminal, {})
+                rule = entries.get(token, entries.get(token[0]))
+                if rule in rules and all(symbol in self.ids for symbol in rules[rule]):
+                    row[cls] = tuple(self.ids[symbol] for symbol in reversed(rules[rule]) if symbol != NonTerminal.WS)
+            self.rows[self.ids[nonterminal]] = row
+
+    def action_kind(self, symbol):
+        kind, value = symbol
+        if kind == Terminal.NEW_VALUE:
+            # Only containers are created by actions, scalars arrive as whole tokens
+            return {list: self.NEW_LIST, dict: self.NEW_OBJECT}.get(value)
+        if kind == Terminal.ADD_VALUE:
+            return self.ADD_MEMBER if value is dict else self.ADD_ELEMENT
+        match value:
+            case NonTerminal.VALUE_STRING:
+                return self.END_STRING
+            case NonTerminal.MEMBER:
+                return self.END_KEY
+            case NonTerminal.VALUE_NUMBER:
+                return self.END_NUMBER
+            case NonTerminal.VALUE_OBJECT:
+                return self.END_OBJECT
+            case NonTerminal.VALUE_ARRAY:
+                return self.END_ARRAY
+        return self.END_VALUE
+
+
+class ParseContext():
+    """
+    Per-call parse state, the LL(1) stack and the stack of values under construction.
+
+    JSONParser.parse creates a fresh context per call unless one is passed in. Reusing a
+    context through JSONParser.context() keeps the same stack lists between documents.
+    A context must only be used by one thread at a time, the parser itself can be shared.
+
+    keys interns object keys, so records repeating the same keys share one str per key,
+    also across documents parsed with the same context. It holds at most MAX_KEYS keys,
+    later new keys are used as they are, and is emptied on reset once full.
+    """
+    MAX_KEYS = 1 << 14
+
+    def __init__(self, parser=None):
+        self.parser = parser
+        self.stack = []
+        self.values_stack = []
+        self.keys = {}
+        self.depth = 0
+        self.token_count = 0
+        # [node, node of the members, key or index of the current member, node of the current member]
+        # per open container, for the validated driver
+        self.frames = []
+
+    def reset(self, start=()):
+        self.stack.clear()
+        self.stack.extend(start)
+        self.values_stack.clear()
+        self.depth = 0
+        self.token_count = 0
+        self.frames.clear()
+        if len(self.keys) >= self.MAX_KEYS:
+            self.keys.clear()
+
+    def intern_key(self, key: str) -> str:
+        """The str equal to key kept in keys, key itself when new, kept while there is room."""
+        interned = self.keys.get(key)
+        if interned is None:
+            interned = key
+            if len(self.keys) < self.MAX_KEYS:
+                self.keys[key] = key
+        return interned
+
+    def parse(self, raw_json: str) -> object:
+        return self.parser.parse(raw_json, context=self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+
+class Trace():
+    """
+    Parse counters, filled in by the traced driver that JSONParser(trace=Trace()) selects. The
+    plain compiled driver has no trace calls at all, so counting is only paid for when asked.
+
+    tokens and values count tokens consumed and values completed, expansions counts rule
+    expansions by NonTerminal. lex_seconds includes number conversion, which happens in the
+    lexer, convert_seconds covers the value actions: string decoding, filling containers and
+    the object hooks. With log=True every step is also sent to logger.debug. A trace can be
+    shared between threads. Worker processes of parse_lines count into their own copy.
+    """
+    def __init__(self, log: bool = False):
+        self.log = log
+        self.lock = threading.Lock()
+        self.reset()
+
+    def __getstate__(self):
+        return {'log': self.log}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def reset(self):
+        self.documents = 0
+        self.tokens = 0
+        self.values = 0
+        self.expansions = Counter()
+        self.lex_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.convert_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        """Counters as plain values, for exporting to metrics."""
+        with self.lock:
+            return {
+                'documents': self.documents,
+                'tokens': self.tokens,
+                'values': self.values,
+                'expansions': {nonterminal.name: n for nonterminal, n in self.expansions.items()},
+                'lex_seconds': self.lex_seconds,
+                'parse_seconds': self.parse_seconds,
+                'convert_seconds': self.convert_seconds,
+            }
+
+
+class ParseCache():
+    """
+    LRU cache of parse results for JSONParser(cache=ParseCache()), for documents that are parsed
+    again and again, such as configs and schemas. Entries are keyed by the raw document, so a
+    lookup costs its str hash (computed once per str object) and, on a hit, one comparison.
+
+    Entries are evicted beyond max_entries or once they take more than max_bytes, counting the
+    raw document and an estimate of the parsed value. Results are shared deep-frozen, dicts as
+    MappingProxyType and lists as tuples, or with frozen=False handed out as fresh copies, so
+    callers cannot change what is cached. Safe to share between threads.
+    """
+    MISSING = object()
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 << 20, frozen: bool = True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.frozen = frozen
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __getstate__(self):
+        # Worker processes start with an empty cache
+        return {'max_entries': self.max_entries, 'max_bytes': self.max_bytes, 'frozen': self.frozen}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get(self, raw_json):
+        """The cached result for raw_json, or MISSING."""
+        with self.lock:
+            entry = self.entries.get(raw_json)
+            if entry is None:
+                self.misses += 1
+                return self.MISSING
+            self.entries.move_to_end(raw_json)
+            self.hits += 1
+        value = entry[0]
+        return value if self.frozen else self.copy(value)
+
+    def put(self, raw_json, value):
+        """Cache value as the result for raw_json and return what the caller should get."""
+        stored = self.freeze(value) if self.frozen else value
+        size = sys.getsizeof(raw_json) + self.value_size(stored)
+        if size <= self.max_bytes:
+            with self.lock:
+                previous = self.entries.pop(raw_json, None)
+                if previous is not None:
+                    self.size -= previous[1]
+                self.entries[raw_json] = (stored, size)
+                self.size += size
+                while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                    _, (_, evicted_size) = self.entries.popitem(last=False)
+                    self.size -= evicted_size
+                    self.evictions += 1
+        return stored if self.frozen else self.copy(stored)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.size}
+
+    @staticmethod
+    def rebuild(value, objects: tuple, arrays: tuple, new_object, new_array):
+        """
+        value with every container of the objects or arrays types rebuilt, members first, by
+        new_object(dict) or new_array(list). With an explicit stack, as deep as the drivers go.
+        """
+        if not isinstance(value, objects + arrays):
+            return value
+        # [members left as (key, item), members done, key in the parent] per open container
+        stack = [[iter(value.items()), {}, None] if isinstance(value, objects) else [iter(enumerate(value)), [], None]]
+        while True:
+            frame = stack[-1]
+            members, done = frame[0], frame[1]
+            for key, item in members:
+                if isinstance(item, objects):
+                    stack.append([iter(item.items()), {}, key])
+                    break
+                if isinstance(item, arrays):
+                    stack.append([iter(enumerate(item)), [], key])
+                    break
+                if done.__class__ is dict:
+                    done[key] = item
+                else:
+                    done.append(item)
+            else:
+                stack.pop()
+                value = new_object(done) if done.__class__ is dict else new_array(done)
+                if not stack:
+                    return value
+                parent = stack[-1][1]
+                if parent.__class__ is dict:
+                    parent[frame[2]] = value
+                else:
+                    parent.append(value)
+
+    @classmethod
+    def freeze(cls, value):
+        return cls.rebuild(value, (dict,), (list,), MappingProxyType, tuple)
+
+    @classmethod
+    def copy(cls, value):
+        return cls.rebuild(value, (dict, MappingProxyType), (list, tuple), dict, list)
+
+    @classmethod
+    def value_size(cls, value) -> int:
+        """Estimated memory of value, shared keys and small ints are counted every time."""
+        size = 0
+        stack = [value]
+        while stack:
+            value = stack.pop()
+            size += sys.getsizeof(value)
+            if isinstance(value, (dict, MappingProxyType)):
+                size += sum(map(sys.getsizeof, value))
+                stack.extend(value.values())
+            elif isinstance(value, (list, tuple)):
+                stack.extend(value)
+        return size
+
+
+class Columns():
+    """
+    Column oriented array of objects that all have the same keys, as built by parse(..., columnar=True).
+    Integer and float columns are array.array('q') and array.array('d'), or NumPy arrays when
+    NumPy is installed, the other columns are lists.
+    """
+    def __init__(self, keys: tuple, columns: list):
+        self.keys = keys
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def __getitem__(self, key):
+        return self.columns[self.keys.index(key)]
+
+    def __repr__(self):
+        return f"Columns(keys={self.keys!r}, rows={len(self)})"
+
+    def records(self) -> list:
+        """The rows as a list of dicts, as a plain parse would return them."""
+        columns = [column.tolist() if not isinstance(column, list) else column for column in self.columns]
+        return [dict(zip(self.keys, row)) for row in zip(*columns)]
+
+
+class ColumnarArray():
+    """
+    Array under construction in columnar mode. While every element is an object with the keys of
+    the first one its values are appended to columns, so no dict is kept per row. Any other
+    element turns it back into a plain list.
+    """
+    __slots__ = ('keys', 'columns', 'rows')
+
+    NUMERIC = {int: 'q', float: 'd'}
+
+    def __init__(self):
+        self.keys = None
+        self.columns = None
+        self.rows = []
+
+    def append(self, value):
+        if self.columns is not None:
+            if value.__class__ is dict and tuple(value) == self.keys:
+                for i, item in enumerate(value.values()):
+                    self.append_item(i, item)
+                return
+            self.rows = Columns(self.keys, self.columns).records()
+            self.keys = self.columns = None
+        elif not self.rows and value.__class__ is dict and value:
+            self.keys = tuple(value)
+            self.columns = [array(self.NUMERIC[item.__class__]) if item.__class__ in self.NUMERIC else []
+                            for item in value.values()]
+            for i, item in enumerate(value.values()):
+                self.append_item(i, item)
+            return
+        self.rows.append(value)
+
+    def append_item(self, i, item):
+        column = self.columns[i]
+        if column.__class__ is not list:
+            kind = item.__class__
+            # Ints only go into or with floats when exact as floats, 2**53 + 1 is not
+            try:
+                if kind is float and column.typecode == 'q' and all(float(n) == n for n in column):
+                    column = self.columns[i] = array('d', column)
+                if kind is int and (column.typecode == 'q' or float(item) == item) or \
+                        kind is float and column.typecode == 'd':
+                    column.append(item)
+                    return
+            except OverflowError:
+                pass
+            column = self.columns[i] = column.tolist()
+        column.append(item)
+
+    def finish(self):
+        if self.columns is None:
+            return self.rows
+        columns = self.columns
+        if load_numpy() is not None:
+            columns = [numpy.frombuffer(column, dtype=column.typecode) if not isinstance(column, list) else column
+                       for column in columns]
+        return Columns(self.keys, columns)
+
+
+class LazyObject(Mapping):
+    """
+    Read-only JSON object returned by parse(..., lazy=True). Its members are only located in the
+    raw text on first access, jumping over nested containers by the ends the structural pass
+    recorded, and each value is decoded when it is first read, then kept. Nested objects and
+    arrays are lazy in turn.
+    """
+    __slots__ = ('parser', 'text', 'ends', 'start', 'spans', 'decoded')
+
+    def __init__(self, parser, text: str, ends: dict, start: int):
+        self.parser = parser
+        self.text = text
+        self.ends = ends
+        self.start = start
+        self.spans = None
+        self.decoded = {}
+
+    def member_spans(self) -> dict:
+        if self.spans is None:
+            self.spans = dict(self.parser.lazy_index(self.text, self.ends, self.start))
+        return self.spans
+
+    def __getitem__(self, key):
+        if key in self.decoded:
+            return self.decoded[key]
+        start, end = self.member_spans()[key]
+        value = self.decoded[key] = self.parser.lazy_value(self.text, self.ends, start, end)
+        return value
+
+    def __iter__(self):
+        return iter(self.member_spans())
+
+    def __len__(self):
+        return len(self.member_spans())
+
+    def __repr__(self):
+        return f"LazyObject({self.text[self.start:self.start + 40]!r}...)"
+
+    def materialize(self) -> dict:
+        """The object as a plain dict, decoding everything left."""
+        return materialize(self)
+
+
+class LazyArray(Sequence):
+    """Read-only JSON array returned by parse(..., lazy=True), see LazyObject."""
+    __slots__ = ('parser', 'text', 'ends', 'start', 'spans', 'decoded')
+
+    def __init__(self, parser, text: str, ends: dict, start: int):
+        self.parser = parser
+        self.text = text
+        self.ends = ends
+        self.start = start
+        self.spans = None
+        self.decoded = {}
+
+    def member_spans(self) -> list:
+        if self.spans is None:
+            self.spans = [span for _, span in self.parser.lazy_index(self.text, self.ends, self.start)]
+        return self.spans
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        spans = self.member_spans()
+        if i < 0:
+            i += len(spans)
+            if i < 0:
+                raise IndexError("list index out of range")
+        if i in self.decoded:
+            return self.decoded[i]
+        start, end = spans[i]
+        value = self.decoded[i] = self.parser.lazy_value(self.text, self.ends, start, end)
+        return value
+
+    def __len__(self):
+        return len(self.member_spans())
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, LazyArray)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"LazyArray({self.text[self.start:self.start + 40]!r}...)"
+
+    def materialize(self) -> list:
+        """The array as a plain list, decoding everything left."""
+        return materialize(self)
+
+
+def materialize(value):
+    """Plain dicts and lists for a value that may hold LazyObject and LazyArray proxies."""
+    done = [value]
+    # (container being filled, key or index there, proxy to decode into it)
+    stack = [(done, 0, value)]
+    while stack:
+        parent, key, value = stack.pop()
+        if isinstance(value, LazyObject):
+            parent[key] = members = dict(value.items())
+            items = members.items()
+        elif isinstance(value, LazyArray):
+            parent[key] = members = list(value)
+            items = enumerate(members)
+        else:
+            continue
+        stack.extend((members, k, v) for k, v in items if isinstance(v, (LazyObject, LazyArray)))
+    return done[0]
+
+
+class LineError(ValueError):
+    """A JSON Lines record that failed to parse, yielded by JSONParser.parse_lines in place of its value."""
+    def __init__(self, lineno: int, msg: str):
+        super().__init__(lineno, msg)
+        self.lineno = lineno
+        self.msg = msg
+
+    def __str__(self):
+        return f"line {self.lineno}: {self.msg}"
+
+
+class LimitError(ValueError):
+    """Raised when a document exceeds one of the JSONParser limits, limit is its name, e.g. 'max_depth'."""
+    def __init__(self, limit: str, value: int):
+        super().__init__(limit, value)
+        self.limit = limit
+        self.value = value
+
+    def __str__(self):
+        return f"{self.limit} of {self.value} exceeded"
+
+
+class SchemaError(ValueError):
+    """Raised by parse(raw, schema=...) on the first value that violates the schema, path is a tuple of keys and indexes."""
+    def __init__(self, path: tuple, msg: str):
+        super().__init__(path, msg)
+        self.path = path
+        self.msg = msg
+
+    def __str__(self):
+        where = ''.join(f"[{step}]" if isinstance(step, int) else f".{step}" for step in self.path)
+        return f"{self.msg} at ${where}"
+
+
+class JSONDecodeError(json.JSONDecodeError):
+    """
+    json.JSONDecodeError that also carries the expected tokens, as names like "','" or 'string'.
+    lineno, colno and snippet are worked out from doc and pos on first use, so parsing itself
+    never counts lines. For parse_file pos and colno count bytes.
+    """
+    SNIPPET_WIDTH = 40
+
+    def __init__(self, msg: str, doc, pos: int, expected=()):
+        ValueError.__init__(self, msg, doc, pos, expected)
+        self.msg = msg
+        self.doc = doc
+        self.pos = pos
+        self.expected = tuple(expected)
+        self.position = None
+
+    def __str__(self):
+        return f"{self.msg}: line {self.lineno} column {self.colno} (char {self.pos})"
+
+    def __reduce__(self):
+        # position too, an error detached in a worker process has no doc left to locate it in
+        return self.__class__, (self.msg, self.doc, self.pos, self.expected), {'position': self.position}
+
+    @property
+    def lineno(self) -> int:
+        return self.locate()[0]
+
+    @property
+    def colno(self) -> int:
+        return self.locate()[1]
+
+    @property
+    def snippet(self) -> str:
+        """The line around pos, clipped to SNIPPET_WIDTH on each side, and a caret under pos."""
+        return self.locate()[2]
+
+    def locate(self):
+        if self.position is None:
+            doc, pos = self.doc, self.pos
+            newline = '\n' if isinstance(doc, str) else b'\n'
+            line_start = doc.rfind(newline, 0, pos) + 1
+            line_end = doc.find(newline, pos)
+            if line_end == -1:
+                line_end = len(doc)
+            start = max(line_start, pos - self.SNIPPET_WIDTH)
+            before = doc[start:pos]
+            after = doc[pos:min(line_end, pos + self.SNIPPET_WIDTH)]
+            if not isinstance(doc, str):
+                before = bytes(before).decode('utf-8', 'replace')
+                after = bytes(after).decode('utf-8', 'replace')
+            lineno = doc[:line_start].count(newline) + 1
+            self.position = (lineno, pos - line_start + 1, f"{before}{after}\n{' ' * len(before)}^")
+        return self.position
+
+    def detach(self):
+        """Work out the position now and drop doc, for documents about to go away such as an mmap."""
+        self.locate()
+        self.doc = None
+
+
+class TokenError(ValueError):
+    """Grammar error at the index-th token (from 1), raised by the drivers and turned into a JSONDecodeError by parse()."""
+    def __init__(self, index: int, msg: str, expected=()):
+        super().__init__(msg)
+        self.index = index
+        self.msg = msg
+        self.expected = expected
+
+
+class Selector():
+    """
+    Simple JSONPath subset used by JSONParser.parse(raw, select=[...]):
+    $ root, .key or ['key'] member, [n] array index, .* or [*] any member or element.
+    """
+    WILDCARD = object()
+    STEP_RE = re.compile(r"""\.(?:(\*)|([^.\[\]]+))|\[(?:(\*)|(\d+)|'([^']*)'|"([^"]*)")\]""")
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        if not expression.startswith('$'):
+            raise ValueError(f"selector must start with $: {expression!r}")
+        steps = []
+        pos = 1
+        while pos < len(expression):
+            m = self.STEP_RE.match(expression, pos)
+            if m is None:
+                raise ValueError(f"bad selector {expression!r} at {pos}")
+            dot_wildcard, dot_key, wildcard, index, single_quoted, double_quoted = m.groups()
+            if dot_wildcard or wildcard:
+                steps.append(self.WILDCARD)
+            elif index is not None:
+                steps.append(int(index))
+            else:
+                steps.append(next(key for key in (dot_key, single_quoted, double_quoted) if key is not None))
+            pos = m.end()
+        self.steps = tuple(steps)
+
+    def __repr__(self):
+        return f"Selector({self.expression!r})"
+
+
+class SchemaNode():
+    """
+    One compiled subschema of a Schema. check() runs the checks on the value itself, validate()
+    also walks its members and elements and runs the combinators. member() and item() give the
+    nodes for a member or element, so the validated driver can look them up as values start.
+    """
+    __slots__ = ('never', 'types', 'enum', 'minimum', 'maximum', 'exclusive_minimum', 'exclusive_maximum',
+                 'min_length', 'max_length', 'pattern', 'required', 'properties', 'pattern_properties',
+                 'additional', 'items', 'additional_items', 'min_items', 'max_items',
+                 'all_of', 'any_of', 'one_of', 'not_', 'deferred', 'checks', 'passing', 'members')
+    TYPE_NAMES = {dict: 'object', list: 'array', str: 'string', bool: 'boolean', type(None): 'null',
+                  int: 'integer', float: 'number'}
+    MAX_MEMBERS = 1024
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+        self.never = False
+        self.required = ()
+        self.properties = {}
+        self.pattern_properties = ()
+        self.all_of = self.any_of = self.one_of = ()
+        self.deferred = False
+        # Whether check() has anything to do, and the classes that pass it on their type alone
+        self.checks = False
+        self.passing = frozenset()
+        # member() by key, up to MAX_MEMBERS keys
+        self.members = {}
+
+    @classmethod
+    def type_name(cls, value) -> str:
+        type_name = cls.TYPE_NAMES.get(value.__class__)
+        if type_name is not None:
+            return type_name
+        if isinstance(value, numbers.Number) and not isinstance(value, bool):
+            return 'integer' if isinstance(value, int) else 'number'
+        return cls.TYPE_NAMES.get(type(value), type(value).__name__)
+
+    def equal(self, value, type_name: str, option) -> bool:
+        """JSON equality for enum and const, 1 equals 1.0 but not true, down through members and elements."""
+        pairs = [(value, type_name, option)]
+        while pairs:
+            value, type_name, option = pairs.pop()
+            option_type = self.type_name(option)
+            if option_type != type_name and not {option_type, type_name} <= {'integer', 'number'}:
+                return False
+            if type_name == 'object':
+                if value.keys() != option.keys():
+                    return False
+                pairs.extend((value[key], self.type_name(value[key]), option[key]) for key in value)
+            elif type_name == 'array':
+                if len(value) != len(option):
+                    return False
+                pairs.extend((item, self.type_name(item), other) for item, other in zip(value, option))
+            elif value != option:
+                return False
+        return True
+
+    def expects(self, type_name: str) -> bool:
+        """Whether a value of type_name can be valid at all, checked as a container starts."""
+        if self.never:
+            return False
+        return self.types is None or type_name in self.types or (type_name == 'integer' and 'number' in self.types)
+
+    def member(self, key: str) -> 'SchemaNode':
+        node = self.members.get(key)
+        if node is None:
+            node = self.find_member(key)
+            if len(self.members) < self.MAX_MEMBERS:
+                self.members[key] = node
+        return node
+
+    def find_member(self, key: str) -> 'SchemaNode':
+        nodes = [self.properties[key]] if key in self.properties else []
+        nodes += [node for regex, node in self.pattern_properties if regex.search(key)]
+        if not nodes:
+            return self.additional or ANY_SCHEMA
+        if len(nodes) == 1:
+            return nodes[0]
+        node = SchemaNode()
+        node.all_of = tuple(nodes)
+        node.deferred = True
+        return node
+
+    def item(self, index: int) -> 'SchemaNode':
+        if isinstance(self.items, tuple):
+            return self.items[index] if index < len(self.items) else self.additional_items or ANY_SCHEMA
+        return self.items or ANY_SCHEMA
+
+    def check(self, value, path: tuple = ()):
+        if not self.checks or value.__class__ in self.passing:
+            return
+        if self.never:
+            raise SchemaError(path, "no value is allowed")
+        type_name = self.type_name(value)
+        if not self.expects(type_name):
+            raise SchemaError(path, f"expected {' or '.join(self.types)}, got {type_name}")
+        if self.enum is not None and not any(self.equal(value, type_name, option) for option in self.enum):
+            raise SchemaError(path, f"{value!r} is not one of {self.enum!r}")
+        if type_name == 'integer' or type_name == 'number':
+            if self.minimum is not None and value < self.minimum:
+                raise SchemaError(path, f"{value!r} is less than the minimum of {self.minimum!r}")
+            if self.maximum is not None and value > self.maximum:
+                raise SchemaError(path, f"{value!r} is more than the maximum of {self.maximum!r}")
+            if self.exclusive_minimum is not None and value <= self.exclusive_minimum:
+                raise SchemaError(path, f"{value!r} is not more than {self.exclusive_minimum!r}")
+            if self.exclusive_maximum is not None and value >= self.exclusive_maximum:
+                raise SchemaError(path, f"{value!r} is not less than {self.exclusive_maximum!r}")
+        elif type_name == 'string':
+            if self.min_length is not None and len(value) < self.min_length:
+                raise SchemaError(path, f"string is shorter than {self.min_length}")
+            if self.max_length is not None and len(value) > self.max_length:
+                raise SchemaError(path, f"string is longer than {self.max_length}")
+            if self.pattern is not None and not self.pattern.search(value):
+                raise SchemaError(path, f"{value!r} does not match {self.pattern.pattern!r}")
+        elif type_name == 'object':
+            for key in self.required:
+                if key not in value:
+                    raise SchemaError(path, f"missing required property {key!r}")
+        elif type_name == 'array':
+            if self.min_items is not None and len(value) < self.min_items:
+                raise SchemaError(path, f"fewer than {self.min_items} items")
+            if self.max_items is not None and len(value) > self.max_items:
+                raise SchemaError(path, f"more than {self.max_items} items")
+
+    def validate(self, value, path: tuple = ()):
+        self.check(value, path)
+        if isinstance(value, dict):
+            for key, member in value.items():
+                node = self.member(key)
+                if node.never:
+                    raise SchemaError(path, f"property {key!r} is not allowed")
+                node.validate(member, path + (key,))
+        elif isinstance(value, list):
+            for index, element in enumerate(value):
+                self.item(index).validate(element, path + (index,))
+        for node in self.all_of:
+            node.validate(value, path)
+        if self.any_of and not any(node.is_valid(value) for node in self.any_of):
+            raise SchemaError(path, "matches none of anyOf")
+        if self.one_of and sum(node.is_valid(value) for node in self.one_of) != 1:
+            raise SchemaError(path, "does not match exactly one of oneOf")
+        if self.not_ is not None and self.not_.is_valid(value):
+            raise SchemaError(path, "matches not")
+
+    def is_valid(self, value) -> bool:
+        try:
+            self.validate(value)
+        except SchemaError:
+            return False
+        return True
+
+
+ANY_SCHEMA = SchemaNode()
+ANY_SCHEMA.passing = frozenset(SchemaNode.TYPE_NAMES)
+
+
+class Schema():
+    """
+    JSON Schema compiled once for parse(raw, schema=Schema(...)). Subschemas become SchemaNodes
+    with local $refs resolved, so while parsing each value only costs a lookup of its node by
+    key or index and that node's checks, run as the value completes. Containers of the wrong
+    type, properties that are not allowed and missing required properties fail as soon as they
+    are seen, before the rest of the document is built.
+
+    Keywords: type, enum, const, minimum, maximum, exclusiveMinimum, exclusiveMaximum (both
+    drafts), minLength, maxLength, pattern, required, properties, patternProperties,
+    additionalProperties, items, additionalItems, minItems, maxItems, allOf, anyOf, oneOf, not
+    and $ref within the document. Others, like format, are ignored. The members of a value
+    under allOf, anyOf, oneOf or not are checked once the whole value is built.
+    """
+    def __init__(self, schema):
+        self.schema = schema
+        self.nodes = {}
+        self.root = self.compile(schema)
+
+    def resolve(self, ref: str):
+        if not ref.startswith('#'):
+            raise ValueError(f"only local $refs are supported: {ref!r}")
+        target = self.schema
+        for step in filter(None, ref[1:].split('/')):
+            step = step.replace('~1', '/').replace('~0', '~')
+            target = target[int(step)] if isinstance(target, list) else target[step]
+        return target
+
+    def compile(self, schema) -> SchemaNode:
+        if schema is True:
+            return ANY_SCHEMA
+        if id(schema) in self.nodes:
+            return self.nodes[id(schema)]
+        node = self.nodes[id(schema)] = SchemaNode()
+        if schema is False:
+            node.never = node.checks = True
+            return node
+        if '$ref' in schema:
+            # Siblings of $ref are ignored, as in draft 4 to 7
+            target = self.compile(self.resolve(schema['$ref']))
+            self.nodes[id(schema)] = target
+            return target
+
+        if 'type' in schema:
+            node.types = (schema['type'],) if isinstance(schema['type'], str) else tuple(schema['type'])
+        if 'enum' in schema:
+            node.enum = list(schema['enum'])
+        if 'const' in schema:
+            node.enum = [schema['const']]
+        node.minimum = schema.get('minimum')
+        node.maximum = schema.get('maximum')
+        # Draft 4 exclusiveMinimum / exclusiveMaximum are flags on minimum / maximum
+        for keyword, bound in [('exclusiveMinimum', 'minimum'), ('exclusiveMaximum', 'maximum')]:
+            exclusive = schema.get(keyword)
+            if exclusive is True:
+                exclusive = getattr(node, bound)
+                setattr(node, bound, None)
+            if exclusive is not False:
+                setattr(node, 'exclusive_' + bound, exclusive)
+        node.min_length = schema.get('minLength')
+        node.max_length = schema.get('maxLength')
+        if 'pattern' in schema:
+            node.pattern = re.compile(schema['pattern'])
+        node.required = tuple(schema.get('required', ()))
+        node.properties = {key: self.compile(value) for key, value in schema.get('properties', {}).items()}
+        node.pattern_properties = tuple((re.compile(pattern), self.compile(value))
+                                        for pattern, value in schema.get('patternProperties', {}).items())
+        if 'additionalProperties' in schema:
+            node.additional = self.compile(schema['additionalProperties'])
+        if isinstance(schema.get('items'), list):
+            node.items = tuple(self.compile(value) for value in schema['items'])
+            if 'additionalItems' in schema:
+                node.additional_items = self.compile(schema['additionalItems'])
+        elif 'items' in schema:
+            node.items = self.compile(schema['items'])
+        node.min_items = schema.get('minItems')
+        node.max_items = schema.get('maxItems')
+        node.all_of = tuple(self.compile(value) for value in schema.get('allOf', ()))
+        node.any_of = tuple(self.compile(value) for value in schema.get('anyOf', ()))
+        node.one_of = tuple(self.compile(value) for value in schema.get('oneOf', ()))
+        if 'not' in schema:
+            node.not_ = self.compile(schema['not'])
+        node.deferred = bool(node.all_of or node.any_of or node.one_of or node.not_ is not None)
+        node.checks = any(getattr(node, name) is not None for name in (
+            'types', 'enum', 'minimum', 'maximum', 'exclusive_minimum', 'exclusive_maximum', 'min_length',
+            'max_length', 'pattern', 'min_items', 'max_items')) or bool(node.required)
+        if node.enum is None and not node.deferred:
+            bounds = {
+                'string': (node.min_length, node.max_length, node.pattern),
+                'integer': (node.minimum, node.maximum, node.exclusive_minimum, node.exclusive_maximum),
+                'object': (node.required or None,),
+                'array': (node.min_items, node.max_items),
+            }
+            bounds['number'] = bounds['integer']
+            node.passing = frozenset(cls for cls, type_name in SchemaNode.TYPE_NAMES.items() if node.expects(type_name)
+                                     and all(bound is None for bound in bounds.get(type_name, ())))
+        return node
+
+    def validate(self, value):
+        """Check an already built value, as parse(raw, schema=self) does while parsing."""
+        self.root.validate(value)
+
+
 class JSONParser():
     """
     json -> element
@@ -117,9 +1045,16 @@ class JSONParser():
             Terminal.ZERO: NonTerminal.ELEMENTS,
             Terminal.ONE_NINE: NonTerminal.ELEMENTS,
             (Terminal.CHAR, '{'): NonTerminal.ELEMENTS,
+            (Terminal.CHAR, '['): NonTerminal.ELEMENTS,
             (Terminal.CHAR, '-'): NonTerminal.ELEMENTS,
-            (Terminal.CHAR, ','): NonTerminal.ELEMENTS_TAIL,
+            (Terminal.CHAR, 'n'): NonTerminal.ELEMENTS,
+            (Terminal.CHAR, 't'): NonTerminal.ELEMENTS,
+            (Terminal.CHAR, 'f'): NonTerminal.ELEMENTS,
             (Terminal.CHAR, ']'): Terminal.EMPTY,
+            Terminal.VALUE_STRING: NonTerminal.ELEMENTS,
+            Terminal.VALUE_NUMBER: NonTerminal.ELEMENTS,
+            Terminal.VALUE_BOOLEAN: NonTerminal.ELEMENTS,
+            Terminal.VALUE_NULL: NonTerminal.ELEMENTS,
         },
         NonTerminal.ELEMENTS_TAIL: {
             (Terminal.CHAR, ','): NonTerminal.ELEMENTS_TAIL,
@@ -136,9 +1071,14 @@ class JSONParser():
             (Terminal.CHAR, 't'): NonTerminal.TRUE,
             (Terminal.CHAR, 'f'): NonTerminal.FALSE,
             (Terminal.CHAR, ' '): NonTerminal.VALUE,
+            Terminal.VALUE_STRING: NonTerminal.STRING_TOKEN,
+            Terminal.VALUE_NUMBER: NonTerminal.NUMBER_TOKEN,
+            Terminal.VALUE_BOOLEAN: NonTerminal.BOOLEAN_TOKEN,
+            Terminal.VALUE_NULL: NonTerminal.NULL_TOKEN,
         },
         NonTerminal.VALUE_STRING: {
-            (Terminal.CHAR, '"'): NonTerminal.VALUE_STRING
+            (Terminal.CHAR, '"'): NonTerminal.VALUE_STRING,
+            Terminal.VALUE_STRING: NonTerminal.KEY_TOKEN,
         },
         NonTerminal.VALUE_ARRAY: {
             (Terminal.CHAR, ']'): (Terminal.CHAR, ']')
@@ -147,6 +1087,7 @@ class JSONParser():
             (Terminal.CHAR, '"'): NonTerminal.MEMBERS,
             (Terminal.CHAR, ','): NonTerminal.MEMBERS,
             (Terminal.CHAR, '}'): Terminal.EMPTY,
+            Terminal.VALUE_STRING: NonTerminal.MEMBERS,
         },
         NonTerminal.MEMBERS_TAIL: {
             (Terminal.CHAR, ','): NonTerminal.MEMBERS_TAIL,
@@ -154,7 +1095,8 @@ class JSONParser():
         },
         NonTerminal.MEMBER: {
             (Terminal.CHAR, '"'): NonTerminal.MEMBER,
-            (Terminal.CHAR, ' '): NonTerminal.MEMBER
+            (Terminal.CHAR, ' '): NonTerminal.MEMBER,
+            Terminal.VALUE_STRING: NonTerminal.MEMBER,
         },
         NonTerminal.INTEGER: {
             NonTerminal.DIGIT: NonTerminal.INTEGER_DIGIT,
@@ -229,18 +1171,22 @@ class JSONParser():
             Terminal.ZERO: Terminal.EMPTY,
             Terminal.END: Terminal.EMPTY,
             Terminal.CHAR: Terminal.EMPTY,
+            Terminal.VALUE_STRING: Terminal.EMPTY,
+            Terminal.VALUE_NUMBER: Terminal.EMPTY,
+            Terminal.VALUE_BOOLEAN: Terminal.EMPTY,
+            Terminal.VALUE_NULL: Terminal.EMPTY,
         },
     }
     rules = {
-        NonTerminal.ELEMENTS: [NonTerminal.VALUE, NonTerminal.WS, NonTerminal.ELEMENTS_TAIL],
-        NonTerminal.ELEMENTS_TAIL: [NonTerminal.WS, (Terminal.CHAR, ','), NonTerminal.VALUE,  NonTerminal.ELEMENTS_TAIL],
+        NonTerminal.ELEMENTS: [NonTerminal.VALUE, (Terminal.ADD_VALUE, list), NonTerminal.WS, NonTerminal.ELEMENTS_TAIL],
+        NonTerminal.ELEMENTS_TAIL: [(Terminal.CHAR, ','), NonTerminal.VALUE, (Terminal.ADD_VALUE, list), NonTerminal.WS, NonTerminal.ELEMENTS_TAIL],
 
-        NonTerminal.MEMBER: [NonTerminal.WS, NonTerminal.VALUE_STRING, NonTerminal.WS, (Terminal.CHAR, ':'), NonTerminal.VALUE],
+        NonTerminal.MEMBER: [NonTerminal.WS, NonTerminal.VALUE_STRING, NonTerminal.WS, (Terminal.CHAR, ':'), NonTerminal.VALUE, (Terminal.ADD_VALUE, dict), NonTerminal.WS],
         NonTerminal.MEMBERS: [NonTerminal.MEMBER, NonTerminal.MEMBERS_TAIL],
         NonTerminal.MEMBERS_TAIL: [(Terminal.CHAR, ','), NonTerminal.MEMBER, NonTerminal.MEMBERS_TAIL],
 
         NonTerminal.VALUE: [NonTerminal.WS, NonTerminal.VALUE, NonTerminal.WS],
-        NonTerminal.VALUE_OBJECT: [(Terminal.NEW_VALUE, list), (Terminal.CHAR, '{'), NonTerminal.WS, NonTerminal.MEMBERS, (Terminal.CHAR, '}'), (Terminal.VALUE_END, NonTerminal.VALUE_OBJECT)],
+        NonTerminal.VALUE_OBJECT: [(Terminal.NEW_VALUE, dict), (Terminal.CHAR, '{'), NonTerminal.WS, NonTerminal.MEMBERS, (Terminal.CHAR, '}'), (Terminal.VALUE_END, NonTerminal.VALUE_OBJECT)],
         NonTerminal.VALUE_ARRAY: [(Terminal.NEW_VALUE, list), (Terminal.CHAR, '['), NonTerminal.WS, NonTerminal.ELEMENTS, (Terminal.CHAR, ']'), (Terminal.VALUE_END, NonTerminal.VALUE_ARRAY)],
         NonTerminal.VALUE_STRING: [(Terminal.NEW_VALUE, str), (Terminal.CHAR, '"'), NonTerminal.CHARS, (Terminal.CHAR, '"'), (Terminal.VALUE_END, NonTerminal.VALUE_STRING)],
 
@@ -269,6 +1215,13 @@ class JSONParser():
 
         NonTerminal.WS: [(Terminal.CHAR, ' '), NonTerminal.WS],
 
+        # Whole-token rules used by the token lexer, the terminal carries the raw value
+        NonTerminal.STRING_TOKEN: [Terminal.VALUE_STRING, (Terminal.VALUE_END, NonTerminal.VALUE_STRING)],
+        NonTerminal.NUMBER_TOKEN: [Terminal.VALUE_NUMBER, (Terminal.VALUE_END, NonTerminal.VALUE_NUMBER)],
+        NonTerminal.BOOLEAN_TOKEN: [Terminal.VALUE_BOOLEAN, (Terminal.VALUE_END, None)],
+        NonTerminal.NULL_TOKEN: [Terminal.VALUE_NULL, (Terminal.VALUE_END, None)],
+        NonTerminal.KEY_TOKEN: [Terminal.VALUE_STRING, (Terminal.VALUE_END, NonTerminal.MEMBER)],
+
         Terminal.ZERO: [Terminal.ZERO],
         Terminal.ONE_NINE: [Terminal.ONE_NINE],
 
@@ -278,28 +1231,182 @@ class JSONParser():
     ESCAPE_SPECIAL_CHARS = set(['"', '\\', '/', 'b', 'f', 'n', 'r', 't', 'u'])
 
     WS = [' ', '\u0020', '\u000A', '\u000D', '\u0009']
+    WS_CHARS = frozenset(WS + ['\n'])
 
-    # Handle stupid mixings of unicode and escaped unicode characaters
-    # https://stackoverflow.com/questions/4020539/process-escape-sequences-in-a-string-in-python
-    ESCAPE_SEQUENCE_RE = re.compile(r'''
-        ( \\U........      # 8-digit hex escapes
-        | \\u....          # 4-digit hex escapes
-        | \\x..            # 2-digit hex escapes
-        | \\[0-7]{1,3}     # Octal escapes
-        | \\N\{[^}]+\}     # Unicode characters by name
-        | \\[\\'"abfnrtv]  # Single-character escapes
-        )''', re.UNICODE | re.VERBOSE)
+    LEXERS = ('token', 'char', 'index')
+    DRIVERS = ('compiled', 'table')
+    VALUE_TERMINALS = frozenset([Terminal.VALUE_STRING, Terminal.VALUE_NUMBER, Terminal.VALUE_BOOLEAN, Terminal.VALUE_NULL])
 
-    def __init__(self):
-        self.stack = [Terminal.END, NonTerminal.WS, NonTerminal.VALUE]
-        self.values_stack = []
+    # Whole-token scanning, one regex match per token instead of one tuple per character
+    WS_RUN_RE = re.compile(r'[ \t\n\r]+')
+    STRING_BODY_RE = re.compile(r'[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"')
+    # Group 1 is the fraction and group 2 the exponent, an integer matches neither
+    NUMBER_RE = re.compile(r'-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?')
+    STRUCTURAL_TOKENS = {c: (Terminal.CHAR, c) for c in '{}[]:,'}
+    # Same scanners over UTF-8 bytes for parse_file
+    WS_RUN_BYTES_RE = re.compile(rb'[ \t\n\r]+')
+    STRING_BODY_BYTES_RE = re.compile(STRING_BODY_RE.pattern.encode())
+    NUMBER_BYTES_RE = re.compile(NUMBER_RE.pattern.encode())
+    WS_BYTES = frozenset(b' \t\n\r')
+    WS_SKIP_RE = re.compile(r'[ \t\n\r]*')
+    # Stage 1 of the index lexer without NumPy, one match per structural character, string or
+    # number / literal run
+    STRUCTURAL_INDEX_BYTES_RE = re.compile(rb'''[ \t\n\r]*(?:
+          ([{}\[\]:,])                                               # structural character
+        | (")[^"\\\x00-\x1f]*(?:(\\.|[\x00-\x1f])(?:[^"\\]|\\.)*)?"  # string, with its first escape or control character
+        | ([^ \t\n\r{}\[\]:,"]+)                                      # number or literal
+        | (")                                                        # a quote that starts no string
+        )''', re.VERBOSE | re.DOTALL)
+    # Bytes a number or literal may be followed by
+    SCALAR_STOP_BYTES = frozenset(b' \t\n\r{}[]:,"')
+    STRUCTURAL_INDEX_BLOCK = 1 << 20
+    # Everything up to the next bracket, skipping whole strings, a '"' that is not a string is captured
+    SKIM_RE = re.compile(r'[^"\[\]{}]*(?:"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"[^"\[\]{}]*)*([\[\]{}"])')
+    SKIM_BYTES_RE = re.compile(SKIM_RE.pattern.encode())
+    # Same with commas, for splitting top-level arrays
+    ARRAY_SPLIT_BYTES_RE = re.compile(rb'[^"\[\]{},]*(?:"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"[^"\[\]{},]*)*([\[\]{},"])')
+    CLOSING_BRACKETS = {'{': '}', '[': ']'}
+    LITERAL_TOKENS = {
+        't': ('true', (Terminal.VALUE_BOOLEAN, True)),
+        'f': ('false', (Terminal.VALUE_BOOLEAN, False)),
+        'n': ('null', (Terminal.VALUE_NULL, None)),
+    }
+
+    # JSON escapes only, a surrogate pair is matched as one escape so it decodes to a single code point
+    ESCAPE_SEQUENCE_RE = re.compile(r'''\\(?:
+          u([dD][89abAB][0-9a-fA-F]{2})\\u([dD][c-fC-F][0-9a-fA-F]{2})  # surrogate pair
+        | u([0-9a-fA-F]{4})                                             # 4-digit hex escape
+        | (["\\/bfnrt])                                                # single-character escape
+        | (.?)                                                          # anything else is invalid
+        )''', re.VERBOSE | re.DOTALL)
+    SIMPLE_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    _compiled_table = None
+    _compiled_table_lock = threading.Lock()
+    START = (Terminal.END, NonTerminal.WS, NonTerminal.VALUE)
+
+    def __init__(self, lexer: str = 'token', driver: str = None, parse_float=None, parse_int=None,
+                 object_pairs_hook=None, max_depth: int = None, max_string_length: int = None,
+                 max_document_size: int = None, max_tokens: int = None, trace: Trace = None,
+                 cache: ParseCache = None):
+        if lexer not in self.LEXERS:
+            raise ValueError(f"unknown lexer {lexer!r}, expected one of {self.LEXERS}")
+        if driver is None:
+            driver = 'table' if lexer == 'char' else 'compiled'
+        if driver not in self.DRIVERS:
+            raise ValueError(f"unknown driver {driver!r}, expected one of {self.DRIVERS}")
+        if driver == 'compiled' and lexer == 'char':
+            raise ValueError("the compiled driver does not accept the char lexer")
+        if driver == 'table' and lexer == 'index':
+            raise ValueError("the index lexer needs the compiled driver")
+        if trace is not None and driver != 'compiled':
+            raise ValueError("tracing needs the compiled driver")
+        self.lexer = lexer
+        self.driver = driver
+        # Number conversion hooks, as in json.loads, e.g. parse_float=decimal.Decimal
+        self.parse_float = parse_float or float
+        self.parse_int = parse_int or int
+        # Called with the list of (key, value) pairs of each object instead of building a dict
+        self.object_pairs_hook = object_pairs_hook
+        # Limits against hostile input, LimitError is raised past them. Sizes and string lengths
+        # count characters of the raw input, bytes for parse_file.
+        self.max_depth = sys.maxsize if max_depth is None else max_depth
+        self.max_string_length = sys.maxsize if max_string_length is None else max_string_length
+        self.max_document_size = sys.maxsize if max_document_size is None else max_document_size
+        self.max_tokens = sys.maxsize if max_tokens is None else max_tokens
+        self.trace = trace
+        self.cache = cache
+
+    def context(self) -> ParseContext:
+        """Reusable parse state for one thread, usable as a context manager."""
+        return ParseContext(self)
+
+    def incremental(self) -> 'IncrementalParser':
+        """Push parser sharing this parser's configuration, see IncrementalParser."""
+        return IncrementalParser(self)
+
+    def editable(self, raw_json: str) -> 'EditableDocument':
+        """raw_json parsed with its span tree, for re-parsing only what edits touch, see EditableDocument."""
+        return EditableDocument(self, raw_json)
 
     def lexical_analysis(self, input_string) -> Generator[Tuple[Terminal,object]]:
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug("Lexical Analysis (LEXXER)")
+        """
+        Token lexer, yields one tuple per JSON token:
+        (Terminal.VALUE_STRING, raw string body), (Terminal.VALUE_NUMBER, number text),
+        (Terminal.VALUE_BOOLEAN, bool), (Terminal.VALUE_NULL, None),
+        (Terminal.CHAR, c) for structural characters and (Terminal.CHAR, ' ') for a whitespace run.
+        """
+
+        return self.scan_tokens(input_string, self.STRUCTURAL_TOKENS, self.LITERAL_TOKENS,
+                                Terminal.VALUE_STRING, self.number_text_token,
+                                (Terminal.CHAR, ' '), (Terminal.END, None))
+
+    def number_text_token(self, m):
+        return (Terminal.VALUE_NUMBER, m.group())
+
+    def compiled_number_token(self, decode: bool = False):
+        """
+        Number token builder for the compiled lexers. Numbers are converted once, straight from
+        the lexer match: without a fraction or exponent group the text goes to parse_int.
+        """
+        VALUE_NUMBER = self.compiled_table().VALUE_NUMBER
+        parse_int = self.parse_int
+        parse_float = self.parse_float
+
+        def number_token(m):
+            text = m.group().decode('ascii') if decode else m.group()
+            if m.lastindex is None:
+                return (VALUE_NUMBER, parse_int(text))
+            return (VALUE_NUMBER, parse_float(text))
+        return number_token
+
+    def scan_tokens(self, input_string, structural, literals, string_class, number_token, ws_token, end_token):
+        """
+        Regex token scanner shared by the token lexer and the compiled driver, which
+        passes integer token classes instead of Terminals and no ws_token.
+        """
+        ws_match = self.WS_RUN_RE.match
+        string_match = self.STRING_BODY_RE.match
+        number_match = self.NUMBER_RE.match
+        max_string_length = self.max_string_length
+
+        pos = 0
+        end = len(input_string)
+        while pos < end:
+            c = input_string[pos]
+            if c in structural:
+                yield structural[c]
+                pos += 1
+            elif c == '"':
+                m = string_match(input_string, pos + 1)
+                if m is None:
+                    raise JSONDecodeError("got invalid string", input_string, pos)
+                if m.end() - pos - 2 > max_string_length:
+                    raise LimitError('max_string_length', self.max_string_length)
+                yield (string_class, input_string[pos + 1:m.end() - 1])
+                pos = m.end()
+            elif c in ' \t\n\r':
+                pos = ws_match(input_string, pos).end()
+                if ws_token is not None:
+                    yield ws_token
+            elif c in literals:
+                word, token = literals[c]
+                if not input_string.startswith(word, pos):
+                    raise JSONDecodeError(f"got invalid input {input_string[pos:pos + len(word)]}", input_string, pos)
+                yield token
+                pos += len(word)
+            else:
+                m = number_match(input_string, pos)
+                if m is None:
+                    raise JSONDecodeError(f"got invalid input {c}", input_string, pos)
+                yield number_token(m)
+                pos = m.end()
+        yield end_token
+
+    def char_lexical_analysis(self, input_string) -> Generator[Tuple[Terminal,object]]:
 
-        for c in input_string:
-            if c in self.WS + ['\n']:
+        for pos, c in enumerate(input_string):
+            if c in self.WS_CHARS:
                 yield (Terminal.CHAR, ' ')
             elif c.isnumeric():
                 if c == '0':
@@ -309,21 +1416,102 @@ class JSONParser():
             elif c >= '\u0020' and c <= '\U0010FFFF':
                 yield (Terminal.CHAR, c)
             else:
-                raise ValueError(f"got invalid input {c}")
+                raise JSONDecodeError(f"got invalid input {c!r}", input_string, pos)
         yield (Terminal.END, None)
 
+    def describe_token(self, token) -> str:
+        """Name of a token, or of a table key, for error messages."""
+        kind, value = token if isinstance(token, tuple) else (token, None)
+        match kind:
+            case Terminal.END:
+                return 'end of input'
+            case Terminal.VALUE_STRING:
+                return 'string'
+            case Terminal.VALUE_NUMBER | Terminal.ZERO | Terminal.ONE_NINE:
+                return 'number' if kind == Terminal.VALUE_NUMBER else 'digit'
+            case Terminal.VALUE_BOOLEAN:
+                return {True: 'true', False: 'false'}.get(value, 'boolean')
+            case Terminal.VALUE_NULL:
+                return 'null'
+            case Terminal.CHAR if value is not None:
+                return repr(value)
+        return kind.name.lower()
+
+    def token_error(self, index: int, token, expected) -> TokenError:
+        """TokenError for token, expected are table keys or tokens. Whitespace is allowed anywhere so it is left out."""
+        expected = sorted({self.describe_token(key) for key in expected if key != (Terminal.CHAR, ' ')})
+        return TokenError(index, f"unexpected {self.describe_token(token)}, expected {' or '.join(expected)}", expected)
+
+    def compiled_token_error(self, index: int, svalue: int, token_class: int, token_value) -> TokenError:
+        compiled = self.compiled_table()
+        token = (compiled.tokens[token_class][0], token_value)
+        if svalue >= compiled.first_rule:
+            expected = [compiled.tokens[cls] for cls, expansion in enumerate(compiled.rows[svalue]) if expansion is not None]
+        else:
+            expected = [compiled.tokens[svalue]]
+        return self.token_error(index, token, expected)
+
+    def token_offset(self, doc, index: int, whitespace: bool = False) -> int:
+        """
+        Offset of the index-th token of doc (from 1), found by scanning again once an error is
+        raised. whitespace counts whitespace runs as tokens, as the table driver sees them.
+        """
+        if self.lexer == 'char':
+            return min(index - 1, len(doc))
+        if isinstance(doc, str):
+            ws, quote, structural = ' \t\n\r', '"', self.STRUCTURAL_TOKENS
+            ws_match, string_match, number_match = self.WS_RUN_RE.match, self.STRING_BODY_RE.match, self.NUMBER_RE.match
+            literals = {c: len(word) for c, (word, _) in self.LITERAL_TOKENS.items()}
+        else:
+            ws, quote, structural = self.WS_BYTES, ord('"'), {ord(c) for c in self.STRUCTURAL_TOKENS}
+            ws_match, string_match, number_match = self.WS_RUN_BYTES_RE.match, self.STRING_BODY_BYTES_RE.match, self.NUMBER_BYTES_RE.match
+            literals = {ord(c): len(word) for c, (word, _) in self.LITERAL_TOKENS.items()}
+
+        pos = 0
+        end = len(doc)
+        while pos < end:
+            c = doc[pos]
+            if c in ws:
+                next_pos = ws_match(doc, pos).end()
+                if not whitespace:
+                    pos = next_pos
+                    continue
+            elif c == quote:
+                m = string_match(doc, pos + 1)
+                next_pos = end if m is None else m.end()
+            elif c in structural:
+                next_pos = pos + 1
+            elif c in literals:
+                next_pos = pos + literals[c]
+            else:
+                m = number_match(doc, pos)
+                next_pos = pos + 1 if m is None else m.end()
+            if index == 1:
+                return pos
+            index -= 1
+            pos = next_pos
+        return end
+
+    def decode_error(self, error: TokenError, doc, whitespace: bool = False) -> JSONDecodeError:
+        return JSONDecodeError(error.msg, doc, self.token_offset(doc, error.index, whitespace), error.expected)
+
     def decode_escapes(self, s):
-        def decode_match(match):
-            try:
-                return codecs.decode(match.group(0), 'unicode-escape')
-            except UnicodeDecodeError:
-                # In case we matched the wrong thing after a double-backslash
-                return match.group(0)
-        return self.ESCAPE_SEQUENCE_RE.sub(decode_match, s)
+        """Decode the JSON escapes in a raw string body, bodies without a backslash are returned as is."""
+        if '\\' not in s:
+            return s
+        return self.ESCAPE_SEQUENCE_RE.sub(self.decode_escape, s)
+
+    def decode_escape(self, match):
+        high, low, code, simple, invalid = match.groups()
+        if high is not None:
+            return chr(0x10000 + ((int(high, 16) - 0xD800) << 10) + int(low, 16) - 0xDC00)
+        if code is not None:
+            return chr(int(code, 16))
+        if simple is not None:
+            return self.SIMPLE_ESCAPES[simple]
+        raise ValueError(f"invalid escape \\{invalid}")
 
     def add_value(self, value1, value2):
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug(f"adding value {value1} and {value2}")
         match value1.__class__.__name__:
             case "str":
                 value1 += value2
@@ -331,19 +1519,676 @@ class JSONParser():
                 value1.append(value2)
         return value1
 
-    def convert_list_to_dict(self, list_value):
-        l = iter(list_value)
-        return dict(zip(l, l))
+    def add_member(self, obj, key, value):
+        if self.object_pairs_hook is None:
+            obj[key] = value
+        else:
+            obj.append((key, value))
+
+    def convert_number(self, value):
+        if '.' in value or 'e' in value or 'E' in value:
+            return self.parse_float(value)
+        return self.parse_int(value)
+
+    @classmethod
+    def compiled_table(cls) -> CompiledTable:
+        if cls._compiled_table is None:
+            with cls._compiled_table_lock:
+                if cls._compiled_table is None:
+                    cls._compiled_table = CompiledTable(cls.table, cls.rules)
+        return cls._compiled_table
+
+    def compiled_lexical_analysis(self, input_string) -> Generator[Tuple[int,object]]:
+        """Token lexer yielding the integer token classes of compiled_table()."""
+        compiled = self.compiled_table()
+        return self.scan_tokens(input_string, compiled.structural, compiled.literals,
+                                compiled.VALUE_STRING, self.compiled_number_token(),
+                                None, (compiled.END, None))
+
+    def bytes_lexical_analysis(self, buffer) -> Generator[Tuple[int,object]]:
+        """
+        Compiled token lexer over a UTF-8 bytes-like buffer such as an mmap. Structure is
+        scanned on the bytes, only string bodies are decoded, from memoryview slices.
+        """
+        compiled = self.compiled_table()
+        structural = {ord(c): token for c, token in compiled.structural.items()}
+        literals = {ord(c): (word.encode(), token) for c, (word, token) in compiled.literals.items()}
+        ws_bytes = self.WS_BYTES
+        max_string_length = self.max_string_length
+        VALUE_STRING = compiled.VALUE_STRING
+        number_token = self.compiled_number_token(decode=True)
+        ws_match = self.WS_RUN_BYTES_RE.match
+        string_match = self.STRING_BODY_BYTES_RE.match
+        number_match = self.NUMBER_BYTES_RE.match
+
+        view = memoryview(buffer)
+        try:
+            pos = 0
+            end = len(view)
+            while pos < end:
+                c = buffer[pos]
+                if c in structural:
+                    yield structural[c]
+                    pos += 1
+                elif c == 34: # '"'
+                    m = string_match(buffer, pos + 1)
+                    if m is None:
+                        raise JSONDecodeError("got invalid string", buffer, pos)
+                    if m.end() - pos - 2 > max_string_length:
+                        raise LimitError('max_string_length', max_string_length)
+                    yield (VALUE_STRING, str(view[pos + 1:m.end() - 1], 'utf-8'))
+                    pos = m.end()
+                elif c in ws_bytes:
+                    pos = ws_match(buffer, pos).end()
+                elif c in literals:
+                    word, token = literals[c]
+                    if buffer[pos:pos + len(word)] != word:
+                        raise JSONDecodeError(f"got invalid input {bytes(buffer[pos:pos + len(word)])}", buffer, pos)
+                    yield token
+                    pos += len(word)
+                else:
+                    m = number_match(buffer, pos)
+                    if m is None:
+                        raise JSONDecodeError(f"got invalid input {bytes(buffer[pos:pos + 1])}", buffer, pos)
+                    yield number_token(m)
+                    pos = m.end()
+            yield (compiled.END, None)
+        finally:
+            view.release()
+
+    def structural_index(self, buffer):
+        """
+        Stage 1 of the index lexer over a UTF-8 bytes-like buffer, with NumPy when it is installed.
+        Returns (positions, escapes, error): the sorted offsets of every structural character,
+        both quotes of every string and the first byte of every number or literal, the sorted
+        offsets of backslashes and control characters inside strings (at least the first one of
+        each string that has any), and (msg, offset) or None.
+        """
+        if load_numpy() is not None:
+            return self.numpy_structural_index(buffer)
+        return self.scan_structural_index(buffer)
+
+    def scan_structural_index(self, buffer):
+        """structural_index() with STRUCTURAL_INDEX_BYTES_RE."""
+        positions = []
+        escapes = []
+        for m in self.STRUCTURAL_INDEX_BYTES_RE.finditer(buffer):
+            if m.start(2) >= 0:
+                positions.append(m.start(2))
+                positions.append(m.end() - 1)
+                if m.start(3) >= 0:
+                    escapes.append(m.start(3))
+            elif m.start(5) >= 0:
+                return positions, escapes, ("got invalid string", m.start(5))
+            else:
+                positions.append(m.start(m.lastindex))
+        return positions, escapes, None
+
+    def numpy_structural_index(self, buffer):
+        """structural_index() with numpy_structural_arrays()."""
+        positions, escapes, error = self.numpy_structural_arrays(buffer)
+        return positions.tolist(), escapes.tolist(), error
+
+    def numpy_structural_arrays(self, buffer):
+        """
+        structural_index() as NumPy arrays, vectorized over blocks of STRUCTURAL_INDEX_BLOCK
+        bytes. A quote is escaped after an odd run of backslashes, and a prefix XOR over the
+        unescaped quotes masks out the insides of strings. Runs and the in-string state are
+        carried across blocks.
+        """
+        kinds = numpy.zeros(256, dtype=numpy.uint8)
+        kinds[list(b' \t\n\r')] = 1
+        kinds[list(b'{}[]:,')] = 2
+        kinds[ord('"')] = 3
+        kinds[ord('\\')] = 4
+
+        data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+        positions = [numpy.empty(0, dtype=numpy.intp)]
+        escapes = [numpy.empty(0, dtype=numpy.intp)]
+        backslash_run = 0
+        in_string = False
+        in_scalar = False
+        for start in range(0, len(data), self.STRUCTURAL_INDEX_BLOCK):
+            block = data[start:start + self.STRUCTURAL_INDEX_BLOCK]
+            kind = kinds[block]
+            backslash = kind == 4
+            index = numpy.arange(len(block))
+            # Offset of the last byte that is not a backslash, runs carried in count from before the block
+            last_plain = numpy.maximum.accumulate(numpy.where(backslash, -1 - backslash_run, index))
+            escaped = numpy.empty(len(block), dtype=bool)
+            escaped[0] = backslash_run & 1
+            escaped[1:] = (index[:-1] - last_plain[:-1]) & 1
+            backslash_run = len(block) - 1 - int(last_plain[-1])
+
+            quote = (kind == 3) & ~escaped
+            string = numpy.bitwise_xor.accumulate(quote.view(numpy.uint8)).view(bool)
+            if in_string:
+                string = ~string
+            in_string = bool(string[-1])
+            outside = ~(string | quote)
+            scalar = outside & ((kind == 0) | backslash)
+            scalar_start = scalar.copy()
+            scalar_start[0] &= not in_scalar
+            scalar_start[1:] &= ~scalar[:-1]
+            in_scalar = bool(scalar[-1])
+
+            positions.append(numpy.flatnonzero(quote | (outside & (kind == 2)) | scalar_start) + start)
+            escapes.append(numpy.flatnonzero(string & ((block < 0x20) | backslash)) + start)
+        positions = numpy.concatenate(positions)
+        escapes = numpy.concatenate(escapes)
+        # Nothing after an unterminated string is marked but its opening quote
+        error = ("got invalid string", int(positions[-1])) if in_string else None
+        return positions, escapes, error
+
+    def index_lexical_analysis(self, buffer) -> Generator[Tuple[int,object]]:
+        """
+        Two stage compiled token lexer over a UTF-8 bytes-like buffer. Stage 1 is
+        structural_index(), stage 2 walks its positions: a string is the bytes between a pair of
+        quotes, only checked by STRING_BODY_BYTES_RE when stage 1 found an escape or control
+        character inside, and numbers and literals are matched where they start.
+        """
+        compiled = self.compiled_table()
+        structural = {ord(c): token for c, token in compiled.structural.items()}
+        literals = {ord(c): (word.encode(), token) for c, (word, token) in compiled.literals.items()}
+        stop = self.SCALAR_STOP_BYTES
+        max_string_length = self.max_string_length
+        VALUE_STRING = compiled.VALUE_STRING
+        number_token = self.compiled_number_token(decode=True)
+        string_match = self.STRING_BODY_BYTES_RE.match
+        number_match = self.NUMBER_BYTES_RE.match
+
+        positions, escapes, error = self.structural_index(buffer)
+        if error is not None:
+            raise JSONDecodeError(error[0], buffer, error[1])
+        end = len(buffer)
+        escapes = iter(escapes)
+        next_escape = next(escapes, end)
+        positions = iter(positions)
+        view = memoryview(buffer)
+        try:
+            for pos in positions:
+                c = buffer[pos]
+                if c in structural:
+                    yield structural[c]
+                elif c == 34: # '"'
+                    close = next(positions)
+                    if close - pos - 1 > max_string_length:
+                        raise LimitError('max_string_length', max_string_length)
+                    if next_escape < close:
+                        m = string_match(buffer, pos + 1)
+                        if m is None or m.end() != close + 1:
+                            raise JSONDecodeError("got invalid string", buffer, pos)
+                        while next_escape < close:
+                            next_escape = next(escapes, end)
+                    yield (VALUE_STRING, str(view[pos + 1:close], 'utf-8'))
+                elif c in literals:
+                    word, token = literals[c]
+                    after = pos + len(word)
+                    if buffer[pos:after] != word:
+                        raise JSONDecodeError(f"got invalid input {str(buffer[pos:after], 'utf-8', 'replace')}", buffer, pos)
+                    if after < end and buffer[after] not in stop:
+                        raise JSONDecodeError(f"got invalid input {str(buffer[after:after + 1], 'utf-8', 'replace')}", buffer, after)
+                    yield token
+                else:
+                    m = number_match(buffer, pos)
+                    after = pos if m is None else m.end()
+                    if after == pos or (after < end and buffer[after] not in stop):
+                        raise JSONDecodeError(f"got invalid input {str(buffer[after:after + 1], 'utf-8', 'replace')}", buffer, after)
+                    yield number_token(m)
+            yield (compiled.END, None)
+        finally:
+            view.release()
+
+    def compiled_syntactical_analysis(self, tokens : Generator[Tuple[int, object]], context: ParseContext = None,
+                                      columnar: bool = False, schema: Schema = None):
+        """
+        LL(1) driver over compiled_table(), the hot loop only compares integers
+        and extends the stack with pre-reversed rule expansions.
+        """
+        if context is None:
+            context = ParseContext(self)
+        context.reset(self.compiled_table().start)
+        self.drive(tokens, context, columnar, schema)
+        if context.stack:
+            raise ValueError("unexpected end of input")
+        assert len(context.values_stack) == 1
+        return context.values_stack.pop()
+
+    def drive(self, tokens, context: ParseContext, columnar: bool = False, schema: Schema = None):
+        """compiled_drive, validated_drive with a schema, or traced_drive when the parser has a Trace."""
+        if schema is not None:
+            self.validated_drive(tokens, context, schema)
+        elif self.trace is None:
+            self.compiled_drive(tokens, context, columnar)
+        else:
+            self.traced_drive(tokens, context, columnar)
+
+    def compiled_drive(self, tokens, context: ParseContext, columnar: bool = False):
+        """
+        Run the compiled driver until every token is consumed. All parse state stays in
+        context, so the driver can be resumed with the next batch of tokens.
+        """
+        compiled = self.compiled_table()
+        rows = compiled.rows
+        actions = compiled.actions
+        first_action = compiled.first_action
+        first_rule = compiled.first_rule
+        VALUE_STRING = compiled.VALUE_STRING
+        NEW_LIST, NEW_OBJECT = compiled.NEW_LIST, compiled.NEW_OBJECT
+        END_STRING, END_KEY, END_OBJECT = compiled.END_STRING, compiled.END_KEY, compiled.END_OBJECT
+        END_ARRAY, ADD_ELEMENT, ADD_MEMBER = compiled.END_ARRAY, compiled.ADD_ELEMENT, compiled.ADD_MEMBER
+        decode_escapes = self.decode_escapes
+        pairs_hook = self.object_pairs_hook
+        new_list = ColumnarArray if columnar else list
+        max_depth = self.max_depth
+        max_tokens = self.max_tokens
+        # With a pairs hook members are collected as (key, value) tuples until the object ends
+        new_object = dict if pairs_hook is None else list
+
+        stack = context.stack
+        values_stack = context.values_stack
+        pop = stack.pop
+        extend = stack.extend
+        push_value = values_stack.append
+        pop_value = values_stack.pop
+        keys = context.keys
+        known_key = keys.get
+        max_keys = context.MAX_KEYS
+
+        # Nesting depth and token count are the only state kept outside the two stacks
+        depth = context.depth
+        count = context.token_count
+        for count, (token_class, token_value) in enumerate(tokens, count + 1):
+            if count > max_tokens:
+                raise LimitError('max_tokens', max_tokens)
+            while True:
+                svalue = pop()
+                if svalue >= first_rule:
+                    expansion = rows[svalue][token_class]
+                    if expansion is None:
+                        raise self.compiled_token_error(count, svalue, token_class, token_value)
+                    extend(expansion)
+                elif svalue >= first_action:
+                    # Members and elements go straight into their container once complete
+                    action = actions[svalue]
+                    if action == ADD_MEMBER:
+                        value = pop_value()
+                        key = pop_value()
+                        if pairs_hook is None:
+                            values_stack[-1][key] = value
+                        else:
+                            values_stack[-1].append((key, value))
+                    elif action == ADD_ELEMENT:
+                        value = pop_value()
+                        values_stack[-1].append(value)
+                    elif action == END_KEY:
+                        key = values_stack[-1]
+                        if '\\' in key:
+                            key = decode_escapes(key)
+                        # context.intern_key() inlined
+                        interned = known_key(key)
+                        if interned is None:
+                            interned = key
+                            if len(keys) < max_keys:
+                                keys[key] = key
+                        values_stack[-1] = interned
+                    elif action == END_STRING:
+                        # Bodies are already sliced out whole by the lexer, only escapes need work
+                        if '\\' in values_stack[-1]:
+                            push_value(decode_escapes(pop_value()))
+                    elif action == NEW_OBJECT:
+                        depth += 1
+                        if depth > max_depth:
+                            raise LimitError('max_depth', max_depth)
+                        push_value(new_object())
+                    elif action == NEW_LIST:
+                        depth += 1
+                        if depth > max_depth:
+                            raise LimitError('max_depth', max_depth)
+                        push_value(new_list())
+                    elif action == END_OBJECT:
+                        depth -= 1
+                        if pairs_hook is not None:
+                            push_value(pairs_hook(pop_value()))
+                    elif action == END_ARRAY:
+                        depth -= 1
+                        if columnar:
+                            push_value(pop_value().finish())
+                elif svalue == token_class:
+                    # Value token classes are laid out last, see CompiledTable
+                    if svalue >= VALUE_STRING:
+                        push_value(token_value)
+                    break
+                else:
+                    raise self.compiled_token_error(count, svalue, token_class, token_value)
+        context.depth = depth
+        context.token_count = count
+
+    def traced_drive(self, tokens, context: ParseContext, columnar: bool = False):
+        """
+        compiled_drive with the counters of self.trace. Kept as a separate loop so the
+        untraced driver carries no instrumentation.
+        """
+        compiled = self.compiled_table()
+        trace = self.trace
+        log = trace.log and logger.isEnabledFor(logging.DEBUG)
+        perf_counter = time.perf_counter
+        expansions = Counter()
+        documents = values = 0
+        lex_seconds = convert_seconds = 0.0
+        pairs_hook = self.object_pairs_hook
+        new_object = dict if pairs_hook is None else list
+        new_list = ColumnarArray if columnar else list
+        stack = context.stack
+        values_stack = context.values_stack
+
+        started = perf_counter()
+        count = first = context.token_count
+        next_token = iter(tokens).__next__
+        try:
+            while True:
+                lex_started = perf_counter()
+                try:
+                    token_class, token_value = next_token()
+                except StopIteration:
+                    break
+                finally:
+                    lex_seconds += perf_counter() - lex_started
+                count += 1
+                if count > self.max_tokens:
+                    raise LimitError('max_tokens', self.max_tokens)
+                while True:
+                    svalue = stack.pop()
+                    if log:
+                        logger.debug(f"{compiled.symbols[svalue]!s} on {compiled.tokens[token_class][0]!s} {token_value!r}")
+                    if svalue >= compiled.first_rule:
+                        expansion = compiled.rows[svalue][token_class]
+                        if expansion is None:
+                            raise self.compiled_token_error(count, svalue, token_class, token_value)
+                        expansions[compiled.symbols[svalue]] += 1
+                        stack.extend(expansion)
+                    elif svalue >= compiled.first_action:
+                        action = compiled.actions[svalue]
+                        convert_started = perf_counter()
+                        if action == compiled.ADD_MEMBER:
+                            value = values_stack.pop()
+                            key = values_stack.pop()
+                            self.add_member(values_stack[-1], key, value)
+                        elif action == compiled.ADD_ELEMENT:
+                            value = values_stack.pop()
+                            values_stack[-1].append(value)
+                        elif action == compiled.END_KEY:
+                            key = self.decode_escapes(values_stack[-1])
+                            values_stack[-1] = context.intern_key(key)
+                        elif action == compiled.NEW_OBJECT or action == compiled.NEW_LIST:
+                            context.depth += 1
+                            if context.depth > self.max_depth:
+                                raise LimitError('max_depth', self.max_depth)
+                            values_stack.append(new_object() if action == compiled.NEW_OBJECT else new_list())
+                        else:
+                            values += 1
+                            if action == compiled.END_STRING:
+                                values_stack.append(self.decode_escapes(values_stack.pop()))
+                            elif action == compiled.END_OBJECT:
+                                context.depth -= 1
+                                if pairs_hook is not None:
+                                    values_stack.append(pairs_hook(values_stack.pop()))
+                            elif action == compiled.END_ARRAY:
+                                context.depth -= 1
+                                if columnar:
+                                    values_stack.append(values_stack.pop().finish())
+                        convert_seconds += perf_counter() - convert_started
+                    elif svalue == token_class:
+                        if svalue >= compiled.VALUE_STRING:
+                            values_stack.append(token_value)
+                        elif svalue == compiled.END:
+                            documents += 1
+                        break
+                    else:
+                        raise self.compiled_token_error(count, svalue, token_class, token_value)
+        finally:
+            context.token_count = count
+            with trace.lock:
+                trace.documents += documents
+                trace.tokens += count - first
+                trace.values += values
+                trace.expansions.update(expansions)
+                trace.lex_seconds += lex_seconds
+                trace.convert_seconds += convert_seconds
+                trace.parse_seconds += perf_counter() - started - lex_seconds - convert_seconds
+
+    def validated_drive(self, tokens, context: ParseContext, schema: Schema):
+        """
+        compiled_drive checking every value against schema as it completes. Containers are
+        checked for their type as they start and each key as it is read, the state per open
+        container is kept in context.frames. Every member is checked as it is read, so with a
+        duplicate key an earlier member that fails rejects the document, where Schema.validate
+        on the result only sees the last one.
+        """
+        compiled = self.compiled_table()
+        rows = compiled.rows
+        actions = compiled.actions
+        first_action = compiled.first_action
+        first_rule = compiled.first_rule
+        VALUE_STRING, END = compiled.VALUE_STRING, compiled.END
+        NEW_LIST, NEW_OBJECT = compiled.NEW_LIST, compiled.NEW_OBJECT
+        END_STRING, END_KEY, END_OBJECT = compiled.END_STRING, compiled.END_KEY, compiled.END_OBJECT
+        END_ARRAY, ADD_ELEMENT, ADD_MEMBER = compiled.END_ARRAY, compiled.ADD_ELEMENT, compiled.ADD_MEMBER
+        decode_escapes = self.decode_escapes
+        max_depth = self.max_depth
+        max_tokens = self.max_tokens
+
+        stack = context.stack
+        values_stack = context.values_stack
+        frames = context.frames
+        pop = stack.pop
+        extend = stack.extend
+        push_value = values_stack.append
+        pop_value = values_stack.pop
+        keys = context.keys
+        known_key = keys.get
+        max_keys = context.MAX_KEYS
+
+        def path() -> tuple:
+            return tuple(frame[2] for frame in frames)
+
+        depth = context.depth
+        count = context.token_count
+        for count, (token_class, token_value) in enumerate(tokens, count + 1):
+            if count > max_tokens:
+                raise LimitError('max_tokens', max_tokens)
+            while True:
+                svalue = pop()
+                if svalue >= first_rule:
+                    expansion = rows[svalue][token_class]
+                    if expansion is None:
+                        raise self.compiled_token_error(count, svalue, token_class, token_value)
+                    extend(expansion)
+                elif svalue >= first_action:
+                    action = actions[svalue]
+                    if action == ADD_MEMBER:
+                        value = pop_value()
+                        key = pop_value()
+                        node = frames[-1][3]
+                        if value.__class__ not in node.passing and not isinstance(value, (dict, list)):
+                            try:
+                                node.validate(value) if node.deferred else node.check(value)
+                            except SchemaError as e:
+                                raise SchemaError(path() + e.path, e.msg) from None
+                        values_stack[-1][key] = value
+                    elif action == ADD_ELEMENT:
+                        value = pop_value()
+                        frame = frames[-1]
+                        node = frame[1].item(frame[2])
+                        if value.__class__ not in node.passing and not isinstance(value, (dict, list)):
+                            try:
+                                node.validate(value) if node.deferred else node.check(value)
+                            except SchemaError as e:
+                                raise SchemaError(path() + e.path, e.msg) from None
+                        frame[2] += 1
+                        values_stack[-1].append(value)
+                    elif action == END_KEY:
+                        key = values_stack[-1]
+                        if '\\' in key:
+                            key = decode_escapes(key)
+                        interned = known_key(key)
+                        if interned is None:
+                            interned = key
+                            if len(keys) < max_keys:
+                                keys[key] = key
+                        key = values_stack[-1] = interned
+                        frame = frames[-1]
+                        frame[2] = key
+                        frame[3] = frame[1].member(key)
+                        if frame[3].never:
+                            raise SchemaError(path()[:-1], f"property {key!r} is not allowed")
+                    elif action == END_STRING:
+                        if '\\' in values_stack[-1]:
+                            push_value(decode_escapes(pop_value()))
+                    elif action == NEW_OBJECT or action == NEW_LIST:
+                        depth += 1
+                        if depth > max_depth:
+                            raise LimitError('max_depth', max_depth)
+                        if not frames:
+                            node = schema.root
+                        elif isinstance(values_stack[-1], str):
+                            node = frames[-1][3]
+                        else:
+                            node = frames[-1][1].item(frames[-1][2])
+                        value = {} if action == NEW_OBJECT else []
+                        if not node.expects('object' if action == NEW_OBJECT else 'array'):
+                            node.check(value, path())
+                        # Members under combinators are only checked with the whole value
+                        frames.append([node, ANY_SCHEMA if node.deferred else node, 0, None])
+                        push_value(value)
+                    elif action == END_OBJECT or action == END_ARRAY:
+                        depth -= 1
+                        node = frames.pop()[0]
+                        if values_stack[-1].__class__ not in node.passing:
+                            try:
+                                node.validate(values_stack[-1]) if node.deferred else node.check(values_stack[-1])
+                            except SchemaError as e:
+                                raise SchemaError(path() + e.path, e.msg) from None
+                elif svalue == token_class:
+                    if svalue >= VALUE_STRING:
+                        push_value(token_value)
+                    elif svalue == END and not isinstance(values_stack[-1], (dict, list)):
+                        schema.root.validate(values_stack[-1])
+                    break
+                else:
+                    raise self.compiled_token_error(count, svalue, token_class, token_value)
+        context.depth = depth
+        context.token_count = count
+
+    def events(self, source) -> Generator[Tuple[tuple, str, object]]:
+        """
+        Stream (path, event, value) tuples without building the document, ijson style.
 
-    def syntactical_analysis(self, tokens : Generator[Tuple[Terminal, object]]):
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug(tokens)
+        source is a str, an iterable of str chunks or a text file object. path is a tuple of
+        keys and array indexes from the root, events are start_map, map_key, end_map,
+        start_array, end_array, string, number, boolean and null.
+        """
+        if isinstance(source, str):
+            if len(source) > self.max_document_size:
+                raise LimitError('max_document_size', self.max_document_size)
+            tokens = self.compiled_lexical_analysis(source)
+        else:
+            if hasattr(source, 'read'):
+                read = source.read
+                source = iter(lambda: read(1 << 16), '')
+            tokens = IncrementalParser(self).scan_chunks(source)
+        context = ParseContext(self)
+        context.reset(self.compiled_table().start)
+        try:
+            yield from self.compiled_events(tokens, context)
+        except TokenError as e:
+            if not isinstance(source, str):
+                raise
+            raise self.decode_error(e, source) from None
+        if context.stack:
+            raise ValueError("unexpected end of input")
+
+    def compiled_events(self, tokens, context: ParseContext):
+        """
+        Variant of compiled_drive that turns the NEW_VALUE / VALUE_END actions into events
+        instead of values, only the path of open containers is kept.
+        """
+        compiled = self.compiled_table()
+        rows = compiled.rows
+        actions = compiled.actions
+        first_action = compiled.first_action
+        first_rule = compiled.first_rule
+        VALUE_STRING = compiled.VALUE_STRING
+        NEW_LIST, NEW_OBJECT = compiled.NEW_LIST, compiled.NEW_OBJECT
+        END_STRING, END_KEY, END_NUMBER = compiled.END_STRING, compiled.END_KEY, compiled.END_NUMBER
+        END_OBJECT, END_ARRAY, END_VALUE = compiled.END_OBJECT, compiled.END_ARRAY, compiled.END_VALUE
+        ADD_ELEMENT = compiled.ADD_ELEMENT
+        decode_escapes = self.decode_escapes
+        max_depth = self.max_depth
+
+        stack = context.stack
+        pop = stack.pop
+        extend = stack.extend
+
+        # path[i] is the key or index inside the i-th open container, None before a map's first key
+        path = []
+        value = None
+
+        for count, (token_class, token_value) in enumerate(tokens, 1):
+            while True:
+                svalue = pop()
+                if svalue >= first_rule:
+                    expansion = rows[svalue][token_class]
+                    if expansion is None:
+                        raise self.compiled_token_error(count, svalue, token_class, token_value)
+                    extend(expansion)
+                elif svalue >= first_action:
+                    action = actions[svalue]
+                    if action == ADD_ELEMENT:
+                        path[-1] += 1
+                    elif action == END_KEY:
+                        if '\\' in value:
+                            value = decode_escapes(value)
+                        path[-1] = value
+                        yield (tuple(path[:-1]), 'map_key', value)
+                    elif action == END_STRING:
+                        if '\\' in value:
+                            value = decode_escapes(value)
+                        yield (tuple(path), 'string', value)
+                    elif action == END_NUMBER:
+                        yield (tuple(path), 'number', value)
+                    elif action == END_VALUE:
+                        yield (tuple(path), 'null' if value is None else 'boolean', value)
+                    elif action == NEW_OBJECT:
+                        if len(path) >= max_depth:
+                            raise LimitError('max_depth', max_depth)
+                        yield (tuple(path), 'start_map', None)
+                        path.append(None)
+                    elif action == NEW_LIST:
+                        if len(path) >= max_depth:
+                            raise LimitError('max_depth', max_depth)
+                        yield (tuple(path), 'start_array', None)
+                        path.append(0)
+                    elif action == END_OBJECT or action == END_ARRAY:
+                        path.pop()
+                        yield (tuple(path), 'end_map' if action == END_OBJECT else 'end_array', None)
+                elif svalue == token_class:
+                    if svalue >= VALUE_STRING:
+                        value = token_value
+                    break
+                else:
+                    raise self.compiled_token_error(count, svalue, token_class, token_value)
+
+    def syntactical_analysis(self, tokens : Generator[Tuple[Terminal, object]], context: ParseContext = None,
+                             columnar: bool = False):
+        if context is None:
+            context = ParseContext(self)
+        context.reset(self.START)
         token = next(tokens)
-        while self.stack:
-            svalue = self.stack.pop()
+        context.token_count = 1
+        while context.stack:
+            svalue = context.stack.pop()
             if isinstance(svalue, Term) or (isinstance(svalue, Tuple) and isinstance(svalue[0], Term)):
-                if logger.isEnabledFor(logging.DEBUG):
-                    logger.debug(f"{svalue = !s}, {token = !s}")
                 if svalue != token[0]:
                     if svalue == Terminal.CHAR and (token[0] == Terminal.ZERO or token[0] == Terminal.ONE_NINE):
                         token = (Terminal.CHAR, token[1])
@@ -358,56 +2203,63 @@ class JSONParser():
                 # Handle conversion to python data structure
                 if isinstance(svalue, Tuple):
                     if svalue[0] == Terminal.VALUE_END:
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug(f"********** adding VALUE END {svalue} -- {self.values_stack}")
                         if svalue[1] == NonTerminal.VALUE_NUMBER:
-                            value = self.values_stack.pop()
-                            if '.' in value or 'e' in value:
-                                self.values_stack.append(float(value))
-                            else:
-                                self.values_stack.append(int(value))
-                        if svalue[1] == NonTerminal.VALUE_STRING:
-                            value = self.values_stack.pop()
-                            self.values_stack.append(self.decode_escapes(value))
-                        if svalue[1] == NonTerminal.VALUE_OBJECT:
-                            value = self.values_stack.pop()
-                            self.values_stack.append(self.convert_list_to_dict(value))
-                        if len(self.values_stack) > 1:
-                            value = self.values_stack.pop()
-                            self.add_value(self.values_stack[-1], value)
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug(f"********** add VALUE END {self.values_stack}")
+                            value = context.values_stack.pop()
+                            context.values_stack.append(self.convert_number(value))
+                        if svalue[1] in (NonTerminal.VALUE_STRING, NonTerminal.MEMBER):
+                            value = context.values_stack.pop()
+                            context.values_stack.append(self.decode_escapes(value))
+                        if svalue[1] == NonTerminal.VALUE_OBJECT and self.object_pairs_hook is not None:
+                            value = context.values_stack.pop()
+                            context.values_stack.append(self.object_pairs_hook(value))
+                        if svalue[1] in (NonTerminal.VALUE_OBJECT, NonTerminal.VALUE_ARRAY):
+                            context.depth -= 1
+                        if svalue[1] == NonTerminal.VALUE_STRING and len(context.values_stack[-1]) > self.max_string_length:
+                            raise LimitError('max_string_length', self.max_string_length)
+                        if svalue[1] == NonTerminal.VALUE_ARRAY and columnar:
+                            value = context.values_stack.pop()
+                            context.values_stack.append(value.finish())
+                        continue
+                    elif svalue[0] == Terminal.ADD_VALUE:
+                        value = context.values_stack.pop()
+                        if svalue[1] is dict:
+                            key = context.values_stack.pop()
+                            self.add_member(context.values_stack[-1], key, value)
+                        else:
+                            context.values_stack[-1].append(value)
                         continue
                     elif svalue[0] == Terminal.NEW_VALUE:
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug(f"********** adding NEW VALUE {self.values_stack}")
-                        if callable(svalue[1]):
-                            self.values_stack.append(svalue[1]())
+                        if svalue[1] in (dict, list):
+                            context.depth += 1
+                            if context.depth > self.max_depth:
+                                raise LimitError('max_depth', self.max_depth)
+                        if svalue[1] is dict and self.object_pairs_hook is not None:
+                            context.values_stack.append([])
+                        elif svalue[1] is list and columnar:
+                            context.values_stack.append(ColumnarArray())
+                        elif callable(svalue[1]):
+                            context.values_stack.append(svalue[1]())
                         else:
-                            self.values_stack.append(svalue[1])
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug(f"********** adding NEW VALUE {self.values_stack}")
+                            context.values_stack.append(svalue[1])
                         continue
+                if svalue in self.VALUE_TERMINALS and svalue == token[0]:
+                    context.values_stack.append(token[1])
+
                 if not isinstance(svalue, Tuple) or svalue[1] in ['-', '+', 'e', 'E', '.', '\\']:
-                    if isinstance(self.values_stack[-1], str):
+                    if isinstance(context.values_stack[-1], str):
                         if token[0] in [Terminal.CHAR, Terminal.ONE_NINE, Terminal.ZERO, Terminal.HEX, Terminal.ESCAPE_SPECIAL]:
-                            if logger.isEnabledFor(logging.DEBUG):
-                                logger.debug(f"********** adding char {token}")
-                            value = self.values_stack.pop()
+                            value = context.values_stack.pop()
                             new_value = self.add_value(value, token[1])
-                            self.values_stack.append(new_value)
+                            context.values_stack.append(new_value)
 
-                if logger.isEnabledFor(logging.DEBUG):
-                    logger.debug(f"TERM: {svalue = !s}, {token = !s}")
                 if svalue == token[0] or svalue == token:
-                    if logger.isEnabledFor(logging.DEBUG):
-                        logger.debug(f"pop {svalue}")
-                    if token[0] == Terminal.END:
-                        logger.info("input accepted")
-                    else:
+                    if token[0] != Terminal.END:
                         token = next(tokens)
+                        context.token_count += 1
+                        if context.token_count > self.max_tokens:
+                            raise LimitError('max_tokens', self.max_tokens)
                 else:
-                    raise ValueError("bad term on input:", str(token))
+                    raise self.token_error(context.token_count, token, [svalue])
             elif isinstance(svalue, Rule):
                 if svalue == NonTerminal.ESCAPE_TAIL:
                     if token[1] in self.ESCAPE_SPECIAL_CHARS:
@@ -416,30 +2268,1060 @@ class JSONParser():
                         else:
                             token = (Terminal.ESCAPE_SPECIAL, token[1])
 
-                if logger.isEnabledFor(logging.DEBUG):
-                    logger.debug(f"RULE: {svalue = !s}, {token = !s}")
                 if token in self.table[svalue]:
                     rule = self.table[svalue][token]
                 elif token[0] in self.table[svalue]:
                     rule = self.table[svalue][token[0]]
                 else:
-                    raise ValueError(f"no rule found: svalue: {str(svalue)} token: {str(token)}")
-                if logger.isEnabledFor(logging.DEBUG):
-                    logger.debug(f"{rule = }")
+                    raise self.token_error(context.token_count, token, self.table[svalue].keys())
                 for r in reversed(self.rules[rule]):
-                    self.stack.append(r)
+                    context.stack.append(r)
 
-            if logger.isEnabledFor(logging.DEBUG):
-                logger.debug("stacks:")
-                logger.debug(self.stack)
 
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug(self.values_stack)
-        assert len(self.values_stack) == 1
-        return self.values_stack[0]
+        assert len(context.values_stack) == 1
+        return context.values_stack.pop()
 
-    def parse(self, raw_json: str) -> object:
-        return self.syntactical_analysis(self.lexical_analysis(raw_json))
+    def select(self, raw_json: str, selectors) -> dict:
+        """
+        Values matching each selector, in document order, as {selector: [values]}.
+
+        Only matching subtrees are built. Everything else is skimmed by bracket and quote
+        matching, so skipped values are only checked for balanced brackets and valid strings.
+        """
+        selectors = [selector if isinstance(selector, Selector) else Selector(selector) for selector in selectors]
+        steps = [selector.steps for selector in selectors]
+        results = [[] for _ in selectors]
+        skip_ws = self.WS_SKIP_RE.match
+
+        pos = skip_ws(raw_json).end()
+        if pos == len(raw_json):
+            raise ValueError("unexpected end of input")
+        pos = skip_ws(raw_json, self.select_value(raw_json, pos, steps, [(i, 0) for i in range(len(steps))], results)).end()
+        if pos != len(raw_json):
+            raise JSONDecodeError("unexpected input after value", raw_json, pos)
+        return {selector.expression: result for selector, result in zip(selectors, results)}
+
+    def select_value(self, text: str, pos: int, steps, active, results) -> int:
+        """Select from the value at pos, active holds (selector, matched steps) pairs. Returns the value end."""
+        done = [i for i, depth in active if depth == len(steps[i])]
+        deeper = [(i, depth) for i, depth in active if depth < len(steps[i])]
+        if deeper and text[pos] in '{[':
+            end = self.select_container(text, pos, steps, deeper, results)
+        else:
+            end = self.skim_value(text, pos)
+        if done:
+            try:
+                value = self.parse_document(text[pos:end])
+            except JSONDecodeError as e:
+                raise JSONDecodeError(e.msg, text, pos + e.pos, e.expected) from None
+            for i in done:
+                results[i].append(value)
+        return end
+
+    def select_container(self, text: str, pos: int, steps, active, results) -> int:
+        skip_ws = self.WS_SKIP_RE.match
+        wildcard = Selector.WILDCARD
+        is_object = text[pos] == '{'
+        closing = '}' if is_object else ']'
+        pos = skip_ws(text, pos + 1).end()
+        if text.startswith(closing, pos):
+            return pos + 1
+
+        index = 0
+        while True:
+            if is_object:
+                if not text.startswith('"', pos):
+                    raise JSONDecodeError("expected member name", text, pos, ['string'])
+                m = self.STRING_BODY_RE.match(text, pos + 1)
+                if m is None:
+                    raise JSONDecodeError("got invalid string", text, pos)
+                step = self.decode_escapes(text[pos + 1:m.end() - 1])
+                pos = skip_ws(text, m.end()).end()
+                if not text.startswith(':', pos):
+                    raise JSONDecodeError("expected ':'", text, pos, ["':'"])
+                pos = skip_ws(text, pos + 1).end()
+            else:
+                step = index
+            matched = [(i, depth + 1) for i, depth in active if steps[i][depth] is wildcard or steps[i][depth] == step]
+            if pos >= len(text):
+                raise ValueError("unexpected end of input")
+            if matched:
+                pos = self.select_value(text, pos, steps, matched, results)
+            else:
+                pos = self.skim_value(text, pos)
+            pos = skip_ws(text, pos).end()
+            if text.startswith(closing, pos):
+                return pos + 1
+            if not text.startswith(',', pos):
+                raise JSONDecodeError(f"expected ',' or {closing!r}", text, pos, ["','", repr(closing)])
+            pos = skip_ws(text, pos + 1).end()
+            index += 1
+
+    def skim_value(self, text: str, pos: int, ends: dict = None) -> int:
+        """
+        End offset of the value at pos, found without building it. With an ends dict, the end of
+        every container inside is recorded there by its start offset.
+        """
+        c = text[pos:pos + 1]
+        if c == '"':
+            m = self.STRING_BODY_RE.match(text, pos + 1)
+            if m is None:
+                raise JSONDecodeError("got invalid string", text, pos)
+            return m.end()
+        if c in self.CLOSING_BRACKETS:
+            closing = [self.CLOSING_BRACKETS[c]]
+            starts = [pos]
+            for m in self.SKIM_RE.finditer(text, pos + 1):
+                c = m.group(1)
+                if c in self.CLOSING_BRACKETS:
+                    closing.append(self.CLOSING_BRACKETS[c])
+                    starts.append(m.end() - 1)
+                elif c == '"':
+                    raise JSONDecodeError("got invalid string", text, m.end() - 1)
+                elif closing.pop() != c:
+                    raise JSONDecodeError(f"mismatched {c!r}", text, m.end() - 1)
+                else:
+                    start = starts.pop()
+                    if ends is not None:
+                        ends[start] = m.end()
+                    if not closing:
+                        return m.end()
+            raise ValueError("unexpected end of input")
+        if c in self.LITERAL_TOKENS:
+            word = self.LITERAL_TOKENS[c][0]
+            if not text.startswith(word, pos):
+                raise JSONDecodeError(f"got invalid input {text[pos:pos + len(word)]}", text, pos)
+            return pos + len(word)
+        m = self.NUMBER_RE.match(text, pos)
+        if m is None:
+            raise JSONDecodeError(f"got invalid input {c}", text, pos)
+        return m.end()
+
+    def parse_lazy(self, raw_json: str) -> object:
+        """
+        Lazy parse, see LazyObject. A single skim over the brackets and strings, the same select()
+        uses, records where each container ends. Anything else wrong is raised when it is read.
+        """
+        skip_ws = self.WS_SKIP_RE.match
+        pos = skip_ws(raw_json).end()
+        if pos == len(raw_json):
+            raise JSONDecodeError("unexpected end of input", raw_json, pos)
+        ends = {}
+        end = self.skim_value(raw_json, pos, ends)
+        if skip_ws(raw_json, end).end() != len(raw_json):
+            raise JSONDecodeError("unexpected input after value", raw_json, skip_ws(raw_json, end).end())
+        return self.lazy_value(raw_json, ends, pos, end)
+
+    def lazy_index(self, text: str, ends: dict, pos: int) -> list:
+        """(key, (start, end)) for the members of the container at pos, key is None in arrays."""
+        skip_ws = self.WS_SKIP_RE.match
+        is_object = text[pos] == '{'
+        closing = '}' if is_object else ']'
+        pos = skip_ws(text, pos + 1).end()
+        members = []
+        if text.startswith(closing, pos):
+            return members
+        while True:
+            key = None
+            if is_object:
+                if not text.startswith('"', pos):
+                    raise JSONDecodeError("expected member name", text, pos, ['string'])
+                m = self.STRING_BODY_RE.match(text, pos + 1)
+                if m is None:
+                    raise JSONDecodeError("got invalid string", text, pos)
+                key = self.decode_escapes(text[pos + 1:m.end() - 1])
+                pos = skip_ws(text, m.end()).end()
+                if not text.startswith(':', pos):
+                    raise JSONDecodeError("expected ':'", text, pos, ["':'"])
+                pos = skip_ws(text, pos + 1).end()
+            if pos >= len(text) or text[pos] in ',]}':
+                raise JSONDecodeError("expected value", text, pos)
+            end = ends[pos] if text[pos] in self.CLOSING_BRACKETS else self.skim_value(text, pos)
+            members.append((key, (pos, end)))
+            pos = skip_ws(text, end).end()
+            if text.startswith(closing, pos):
+                return members
+            if not text.startswith(',', pos):
+                raise JSONDecodeError(f"expected ',' or {closing!r}", text, pos, ["','", repr(closing)])
+            pos = skip_ws(text, pos + 1).end()
+
+    def lazy_value(self, text: str, ends: dict, start: int, end: int) -> object:
+        """The value spanning text[start:end], containers as lazy proxies."""
+        c = text[start]
+        if c == '{':
+            return LazyObject(self, text, ends, start)
+        if c == '[':
+            return LazyArray(self, text, ends, start)
+        if c == '"':
+            return self.decode_escapes(text[start + 1:end - 1])
+        if c in self.LITERAL_TOKENS:
+            word, (_, value) = self.LITERAL_TOKENS[c]
+            if text[start:end] == word:
+                return value
+        m = self.NUMBER_RE.match(text, start)
+        if m is None or m.end() != end:
+            raise JSONDecodeError(f"got invalid input {text[start:end]}", text, start)
+        return self.parse_int(m.group()) if m.lastindex is None else self.parse_float(m.group())
+
+    def parse_file(self, path, context: ParseContext = None, columnar: bool = False) -> object:
+        """Parse a UTF-8 JSON file through mmap without reading or decoding it up front."""
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                raise ValueError("unexpected end of input")
+            if size > self.max_document_size:
+                raise LimitError('max_document_size', self.max_document_size)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if self.lexer == 'index':
+                    tokens = self.index_lexical_analysis(buffer)
+                else:
+                    tokens = self.bytes_lexical_analysis(buffer)
+                try:
+                    return self.compiled_syntactical_analysis(tokens, context, columnar)
+                except TokenError as e:
+                    error = self.decode_error(e, buffer)
+                    error.detach()
+                    raise error from None
+                except JSONDecodeError as e:
+                    e.detach()
+                    raise
+                finally:
+                    tokens.close()
+
+    def parse_many(self, documents, context: ParseContext = None, batch_size: int = 1000):
+        """
+        Parse each str of documents, yielding the values in order. For many small documents,
+        where setting up a parse costs more than the parse: one context is reused, and the
+        compiled driver runs once per batch_size documents over all their tokens instead of
+        once per document. The first document that fails raises as parse() would, after the
+        values of the documents before it. With a cache, trace, token limit or a lexer other
+        than 'token', each document goes through parse().
+        """
+        context = context or ParseContext(self)
+        if self.driver != 'compiled' or self.lexer != 'token' or self.trace is not None or \
+                self.cache is not None or self.max_tokens != sys.maxsize:
+            for raw_json in documents:
+                yield self.parse(raw_json, context)
+            return
+        documents = iter(documents)
+        while batch := list(islice(documents, batch_size)):
+            values = []
+            error = None
+            context.reset()
+            try:
+                self.compiled_drive(self.batch_tokens(batch, context, values), context)
+            except ValueError as e:
+                error = e
+            yield from values
+            if error is not None:
+                # Parsed again alone, for the error parse() raises with offsets into the document
+                self.parse(batch[len(values)], context)
+                raise error
+
+    def batch_tokens(self, documents: list, context: ParseContext, values: list) -> Generator[Tuple[int,object]]:
+        """
+        compiled_lexical_analysis() of each document in turn, for one run of the compiled
+        driver. Between documents the value is moved to values and the start rule pushed again.
+        """
+        compiled = self.compiled_table()
+        tokens = (compiled.structural, compiled.literals, compiled.VALUE_STRING, self.compiled_number_token(),
+                  None, (compiled.END, None))
+        scan_tokens = self.scan_tokens
+        start = compiled.start
+        extend = context.stack.extend
+        pop_value = context.values_stack.pop
+        add_value = values.append
+        max_document_size = self.max_document_size
+        for raw_json in documents:
+            if len(raw_json) > max_document_size:
+                raise LimitError('max_document_size', max_document_size)
+            extend(start)
+            yield from scan_tokens(raw_json, *tokens)
+            # Only asked for the next token once the driver has taken END, the document is done
+            add_value(pop_value())
+
+    def parse_lines(self, source, workers: int = 1, ordered: bool = True, batch_size: int = 1000):
+        """
+        Parse JSON Lines, yielding (lineno, value) for every non blank line. A line that fails
+        to parse yields a LineError as its value instead of stopping the batch.
+
+        source is a path or an iterable of lines. With workers > 1 a path is split into
+        newline aligned byte ranges that worker processes map and parse themselves, an
+        iterable is sent to the workers in batches of batch_size lines. ordered=False yields
+        each range or batch as soon as it is done.
+        """
+        if isinstance(source, (str, bytes, os.PathLike)):
+            tasks = [(self, source, start, end, lineno) for start, end, lineno in split_lines(source, workers * 4)]
+            function = parse_lines_range
+        else:
+            tasks = ((self, lineno, batch) for lineno, batch in batch_lines(source, batch_size))
+            function = parse_lines_batch
+
+        if workers <= 1:
+            for task in tasks:
+                yield from function(*task)
+            return
+        import multiprocessing
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.imap(star_call, ((function, task) for task in tasks)) if ordered else \
+                      pool.imap_unordered(star_call, ((function, task) for task in tasks))
+            for result in results:
+                yield from result
+
+    def parse_parallel(self, path, workers: int = None) -> object:
+        """
+        Parse a UTF-8 file holding one large array in worker processes. The array is split at
+        commas between its elements into about workers * 4 byte ranges, each worker maps the
+        file and parses its ranges, and the elements come back in order. Anything but an array,
+        or workers=1, goes to parse_file.
+        """
+        workers = workers or os.cpu_count()
+        with open(path, 'rb') as f:
+            array = f.read(1 << 16).lstrip(b' \t\n\r').startswith(b'[')
+        if workers <= 1 or not array:
+            return self.parse_file(path)
+        if os.path.getsize(path) > self.max_document_size:
+            raise LimitError('max_document_size', self.max_document_size)
+        result = []
+        import multiprocessing
+        with multiprocessing.Pool(workers) as pool:
+            # The pool takes ranges as split_array finds them, so workers start before the scan ends
+            tasks = ((parse_array_range, (self, path, start, end)) for start, end in split_array(self, path, workers * 4))
+            for elements in pool.imap(star_call, tasks):
+                result.extend(elements)
+        return result
+
+    def array_split_points(self, buffer, start: int, parts: int):
+        """
+        For the array opening at start, yields the offsets of about parts - 1 commas between its
+        elements, spread evenly over the bytes, then the offset of its closing bracket.
+        """
+        if load_numpy() is not None:
+            yield from self.numpy_array_split_points(buffer, start, parts)
+            return
+        size = len(buffer)
+        targets = iter([start + (size - start) * part // parts for part in range(1, parts)] + [size])
+        target = next(targets)
+        depth = 1
+        pos = start + 1
+        # Brackets only, commas are looked for between two brackets at depth 1 once past a target
+        for m in self.SKIM_BYTES_RE.finditer(buffer, start + 1):
+            bracket = m.end() - 1
+            if depth == 1 and bracket > target:
+                for comma in self.ARRAY_SPLIT_BYTES_RE.finditer(buffer, pos, bracket):
+                    comma = comma.end() - 1
+                    if buffer[comma] != 44: # ','
+                        break
+                    if comma >= target:
+                        yield comma
+                        while target <= comma:
+                            target = next(targets)
+            c = buffer[bracket]
+            if c == 91 or c == 123: # '[' '{'
+                depth += 1
+            elif c == 93 or c == 125: # ']' '}'
+                depth -= 1
+                if depth == 0:
+                    yield bracket
+                    return
+            else:
+                raise JSONDecodeError("got invalid string", buffer, bracket)
+            pos = m.end()
+        raise JSONDecodeError("unexpected end of input", buffer, size)
+
+    def numpy_array_split_points(self, buffer, start: int, parts: int):
+        """array_split_points() over the positions of numpy_structural_arrays()."""
+        positions, _, error = self.numpy_structural_arrays(buffer)
+        if error is not None:
+            raise JSONDecodeError(error[0], buffer, error[1])
+        chars = numpy.frombuffer(buffer, dtype=numpy.uint8)[positions]
+        steps = ((chars == 91) | (chars == 123)).astype(numpy.int8) - ((chars == 93) | (chars == 125))
+        depths = numpy.cumsum(steps)
+        closing = numpy.flatnonzero(depths == 0)
+        if len(closing) == 0:
+            raise JSONDecodeError("unexpected end of input", buffer, len(buffer))
+        close = int(positions[closing[0]])
+        commas = positions[(chars == 44) & (depths == 1)]
+        commas = commas[commas < close]
+        targets = [start + (len(buffer) - start) * part // parts for part in range(1, parts)]
+        chosen = numpy.unique(numpy.searchsorted(commas, targets))
+        yield from commas[chosen[chosen < len(commas)]].tolist()
+        yield close
+
+    def parse(self, raw_json: str, context: ParseContext = None, select=None, columnar: bool = False,
+              lazy: bool = False, schema: Schema = None) -> object:
+        """
+        Parse raw_json, or with select=[selectors] only the matching values, see select().
+        columnar=True returns arrays of same-shaped objects as Columns instead of lists of dicts.
+        lazy=True returns LazyObject / LazyArray proxies that decode values on first access.
+        With a compiled Schema, values are validated as they are parsed and the first one that
+        does not match raises SchemaError.
+        With a ParseCache, plain parses are looked up there first.
+        """
+        if len(raw_json) > self.max_document_size:
+            raise LimitError('max_document_size', self.max_document_size)
+        if schema is not None:
+            if select is not None or columnar or lazy:
+                raise ValueError("schema validation needs a plain parse")
+            if self.driver != 'compiled' or self.trace is not None or self.object_pairs_hook is not None:
+                raise ValueError("schema validation needs the compiled driver without trace or object_pairs_hook")
+            return self.parse_document(raw_json, context, schema=schema)
+        if select is not None:
+            return self.select(raw_json, select)
+        if lazy:
+            return self.parse_lazy(raw_json)
+        if self.cache is None or columnar:
+            return self.parse_document(raw_json, context, columnar)
+        value = self.cache.get(raw_json)
+        if value is ParseCache.MISSING:
+            value = self.cache.put(raw_json, self.parse_document(raw_json, context))
+        return value
+
+    def parse_index(self, raw_json: str, context: ParseContext = None, columnar: bool = False,
+                    schema: Schema = None) -> object:
+        """Compiled driver over index_lexical_analysis() of raw_json encoded to UTF-8."""
+        data = raw_json.encode('utf-8')
+        try:
+            return self.compiled_syntactical_analysis(self.index_lexical_analysis(data), context, columnar, schema)
+        except JSONDecodeError as e:
+            if e.doc is not data:
+                raise
+            # Offsets are into the UTF-8 bytes, report them in characters
+            raise JSONDecodeError(e.msg, raw_json, len(data[:e.pos].decode('utf-8', 'ignore')), e.expected) from None
+
+    def parse_document(self, raw_json: str, context: ParseContext = None, columnar: bool = False,
+                       schema: Schema = None) -> object:
+        """parse() without the selectors, limits on size and cache."""
+        try:
+            if self.lexer == 'index':
+                return self.parse_index(raw_json, context, columnar, schema)
+            if self.driver == 'compiled':
+                return self.compiled_syntactical_analysis(self.compiled_lexical_analysis(raw_json), context, columnar, schema)
+            if self.lexer == 'char':
+                return self.syntactical_analysis(self.char_lexical_analysis(raw_json), context, columnar)
+            return self.syntactical_analysis(self.lexical_analysis(raw_json), context, columnar)
+        except TokenError as e:
+            raise self.decode_error(e, raw_json, whitespace=self.driver == 'table') from None
+
+
+def split_lines(path, parts: int):
+    """Split a file into about parts (start, end, first line number) byte ranges that end on a newline."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            ranges = []
+            start = 0
+            lineno = 1
+            for part in range(1, parts + 1):
+                end = size if part == parts else buffer.find(b'\n', max(start, size * part // parts))
+                end = size if end == -1 else min(end + 1, size)
+                if end > start:
+                    ranges.append((start, end, lineno))
+                    lineno += buffer[start:end].count(b'\n')
+                    start = end
+                if start == size:
+                    break
+            return ranges
+
+
+def batch_lines(lines, batch_size: int):
+    """(first line number, lines) batches of an iterable of lines."""
+    batch = []
+    lineno = 1
+    for line in lines:
+        batch.append(line)
+        if len(batch) == batch_size:
+            yield lineno, batch
+            lineno += len(batch)
+            batch = []
+    if batch:
+        yield lineno, batch
+
+
+def parse_lines_batch(parser: JSONParser, lineno: int, lines) -> list:
+    results = []
+    with parser.context() as context:
+        for lineno, line in enumerate(lines, lineno):
+            if not line.strip():
+                continue
+            try:
+                if isinstance(line, bytes):
+                    line = line.decode('utf-8')
+                if len(line) > parser.max_document_size:
+                    raise LimitError('max_document_size', parser.max_document_size)
+                # Not parse(), lines bypass the cache, whose frozen values cannot be pickled
+                results.append((lineno, parser.parse_document(line, context)))
+            except ValueError as e:
+                results.append((lineno, LineError(lineno, e.msg if isinstance(e, JSONDecodeError) else str(e))))
+    return results
+
+
+def parse_lines_range(parser: JSONParser, path, start: int, end: int, lineno: int) -> list:
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            lines = buffer[start:end].split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
+    return parse_lines_batch(parser, lineno, lines)
+
+
+def split_array(parser: JSONParser, path, parts: int):
+    """
+    Yields (start, end) byte ranges of about parts runs of elements of the array a file holds,
+    without the commas between them, as they are found.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > parser.max_document_size:
+            raise LimitError('max_document_size', parser.max_document_size)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start = parser.WS_RUN_BYTES_RE.match(buffer)
+            start = 0 if start is None else start.end()
+            if buffer[start:start + 1] != b'[':
+                raise ValueError("expected an array")
+            try:
+                bound = start
+                for end in parser.array_split_points(buffer, start, parts):
+                    # Only a blank [] holds no range at all
+                    if bound != start or buffer[end] == 44 or buffer[bound + 1:end].strip():
+                        yield bound + 1, end
+                    bound = end
+                after = parser.WS_RUN_BYTES_RE.match(buffer, end + 1)
+                after = end + 1 if after is None else after.end()
+                if after != size:
+                    raise JSONDecodeError("unexpected input after value", buffer, after)
+            except JSONDecodeError as e:
+                e.detach()
+                raise
+
+
+def parse_array_range(parser: JSONParser, path, start: int, end: int) -> list:
+    """Elements in a range of split_array(), errors point into the whole file."""
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            text = '[' + str(buffer[start:end], 'utf-8') + ']'
+            try:
+                if not text[1:-1].strip():
+                    raise JSONDecodeError("expected value", text, len(text) - 1)
+                # Not parse(), ranges bypass the cache and return what parse_file() would
+                return parser.parse_document(text)
+            except JSONDecodeError as e:
+                error = JSONDecodeError(e.msg, buffer, start + len(text[1:e.pos].encode('utf-8')), e.expected)
+                error.detach()
+                raise error from None
+
+
+def star_call(function_args):
+    function, args = function_args
+    return function(*args)
+
+
+class IncrementalParser():
+    """
+    Push parser for input that arrives in chunks. feed() each chunk as it arrives and close()
+    at the end of the document to get the value. Tokens cut by a chunk boundary, including
+    strings, escapes and numbers, are carried over to the next chunk while the LL(1) stack and
+    values_stack live in a ParseContext between calls.
+
+    After close() the parser is ready for the next document, after a ValueError call reset().
+    """
+    # Unterminated string body: the complete part, then an escape cut short by the chunk boundary
+    STRING_PREFIX_RE = re.compile(r'([^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*)(\\(?:u[0-9a-fA-F]{0,3})?)?')
+    NUMBER_PREFIX_RE = re.compile(r'-?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?(?:[eE][-+]?[0-9]*)?)?')
+    NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+    def __init__(self, parser: 'JSONParser' = None):
+        self.parser = parser or JSONParser()
+        self.context = ParseContext(self.parser)
+        self.reset()
+
+    def reset(self):
+        self.context.reset(self.parser.compiled_table().start)
+        self.pending = ''
+        self.string_parts = None
+        self.size = 0
+
+    def feed(self, chunk: str):
+        self.parser.drive(self.scan(chunk, final=False), self.context)
+
+    def close(self) -> object:
+        try:
+            self.parser.drive(self.scan('', final=True), self.context)
+            if self.context.stack:
+                raise ValueError("unexpected end of input")
+            return self.context.values_stack.pop()
+        finally:
+            self.reset()
+
+    def scan(self, chunk: str, final: bool):
+        """Token lexer over pending + chunk, keeping an incomplete trailing token in pending."""
+        compiled = self.parser.compiled_table()
+        structural = compiled.structural
+        literals = compiled.literals
+        max_string_length = self.parser.max_string_length
+        ws_match = JSONParser.WS_RUN_RE.match
+        string_match = JSONParser.STRING_BODY_RE.match
+        number_match = JSONParser.NUMBER_RE.match
+        number_token = self.parser.compiled_number_token()
+
+        self.size += len(chunk)
+        if self.size > self.parser.max_document_size:
+            raise LimitError('max_document_size', self.parser.max_document_size)
+        text = self.pending + chunk if self.pending else chunk
+        self.pending = ''
+        pos = 0
+        end = len(text)
+
+        if self.string_parts is not None:
+            m = string_match(text)
+            if m is None:
+                self.carry_string(text, 0, final)
+                return
+            self.string_parts.append(text[:m.end() - 1])
+            body = ''.join(self.string_parts)
+            if len(body) > max_string_length:
+                raise LimitError('max_string_length', max_string_length)
+            yield (compiled.VALUE_STRING, body)
+            self.string_parts = None
+            pos = m.end()
+
+        while pos < end:
+            c = text[pos]
+            if c in structural:
+                yield structural[c]
+                pos += 1
+            elif c == '"':
+                m = string_match(text, pos + 1)
+                if m is None:
+                    self.string_parts = []
+                    self.carry_string(text, pos + 1, final)
+                    return
+                if m.end() - pos - 2 > max_string_length:
+                    raise LimitError('max_string_length', max_string_length)
+                yield (compiled.VALUE_STRING, text[pos + 1:m.end() - 1])
+                pos = m.end()
+            elif c in ' \t\n\r':
+                pos = ws_match(text, pos).end()
+            elif c in literals:
+                word, token = literals[c]
+                if text.startswith(word, pos):
+                    yield token
+                    pos += len(word)
+                elif not final and end - pos < len(word) and word.startswith(text[pos:]):
+                    self.pending = text[pos:]
+                    return
+                else:
+                    raise ValueError(f"got invalid input {text[pos:pos + len(word)]}")
+            else:
+                m = number_match(text, pos)
+                if (m is None or m.end() == end or text[m.end()] in self.NUMBER_CHARS) and \
+                   not final and self.NUMBER_PREFIX_RE.fullmatch(text, pos):
+                    # The number may continue in the next chunk
+                    self.pending = text[pos:]
+                    return
+                if m is None:
+                    raise ValueError(f"got invalid input {c}")
+                yield number_token(m)
+                pos = m.end()
+
+        if final:
+            yield (compiled.END, None)
+
+    def scan_chunks(self, chunks):
+        """Tokens of a whole document given as an iterable of chunks."""
+        for chunk in chunks:
+            yield from self.scan(chunk, final=False)
+        yield from self.scan('', final=True)
+
+    def carry_string(self, text: str, pos: int, final: bool):
+        m = self.STRING_PREFIX_RE.fullmatch(text, pos)
+        if m is None:
+            raise ValueError(f"got invalid string at {pos}")
+        if final:
+            raise ValueError("unterminated string")
+        self.string_parts.append(m.group(1))
+        if sum(map(len, self.string_parts)) > self.parser.max_string_length:
+            raise LimitError('max_string_length', self.parser.max_string_length)
+        self.pending = m.group(2) or ''
+
+
+async def parse_stream(reader, parser: JSONParser = None, chunk_size: int = 1 << 16,
+                       yield_tokens: int = 10_000, yield_interval: float = 0.005,
+                       offload_size: int = None, executor=None) -> object:
+    """
+    Parse the UTF-8 JSON document read from an asyncio.StreamReader until EOF without holding
+    the event loop: chunks go through an IncrementalParser as they arrive, and the driver hands
+    control back to the loop after yield_tokens tokens or yield_interval seconds.
+
+    With offload_size, a body that reaches that many bytes is read whole and parsed by
+    executor, the loop's default thread pool when None. Pass a ProcessPoolExecutor to take
+    the parse off the event loop's interpreter lock as well.
+    """
+    import asyncio
+    parser = parser or JSONParser()
+    loop = asyncio.get_running_loop()
+    chunks = []
+    if offload_size is not None:
+        size = 0
+        while size < offload_size and (chunk := await reader.read(chunk_size)):
+            chunks.append(chunk)
+            size += len(chunk)
+        if size >= offload_size:
+            while chunk := await reader.read(chunk_size):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > parser.max_document_size:
+                    raise LimitError('max_document_size', parser.max_document_size)
+            return await loop.run_in_executor(executor, parser.parse, b''.join(chunks).decode('utf-8'))
+
+    incremental = IncrementalParser(parser)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    last_yield = time.perf_counter()
+    driven = 0
+
+    async def drive(tokens):
+        nonlocal last_yield, driven
+        while batch := list(islice(tokens, 256)):
+            parser.drive(batch, incremental.context)
+            driven += len(batch)
+            if driven >= yield_tokens or time.perf_counter() - last_yield >= yield_interval:
+                await asyncio.sleep(0)
+                last_yield = time.perf_counter()
+                driven = 0
+
+    # Chunks read while checking offload_size, then the rest of the body
+    for chunk in chunks:
+        await drive(incremental.scan(decoder.decode(chunk), final=False))
+    while chunk := await reader.read(chunk_size):
+        await drive(incremental.scan(decoder.decode(chunk), final=False))
+    await drive(incremental.scan(decoder.decode(b'', final=True), final=True))
+    if incremental.context.stack:
+        raise ValueError("unexpected end of input")
+    return incremental.context.values_stack.pop()
+
+
+class SpanNode():
+    """
+    Source spans of the members or elements of one container in an EditableDocument: starts
+    relative to the container's own start and lengths, the nodes of those that are containers
+    themselves, and keys for an object.
+    """
+    __slots__ = ('keys', 'starts', 'lengths', 'children')
+
+    def __init__(self, keys, starts: array, lengths: array, children: list):
+        self.keys = keys
+        self.starts = starts
+        self.lengths = lengths
+        self.children = children
+
+
+class EditableDocument():
+    """
+    A parsed document kept with the source offsets of every value, so an edit only re-parses
+    the smallest value around it. edit() tries that value first, then its enclosing containers
+    when the edited text no longer parses on its own. The new value is put into the previous
+    result in place and only the offsets of its later siblings and the lengths of the enclosing
+    containers move, as offsets are kept relative to each container.
+
+    value is the current result and text the current source. An edit that leaves the whole
+    document invalid raises and changes neither. Parses bypass the parser's cache, whose
+    results are frozen.
+    """
+    def __init__(self, parser: JSONParser, raw_json: str):
+        if parser.object_pairs_hook is not None:
+            raise ValueError("editable documents need plain dicts")
+        self.parser = parser
+        self.reset(raw_json)
+
+    def reset(self, raw_json: str):
+        """Parse raw_json in full."""
+        if len(raw_json) > self.parser.max_document_size:
+            raise LimitError('max_document_size', self.parser.max_document_size)
+        value = self.parser.parse_document(raw_json)
+        spans = self.spans(raw_json, 0)
+        self.value, self.text = value, raw_json
+        self.start, self.end, self.root = spans
+
+    def spans(self, text: str, pos: int):
+        """(start, end, SpanNode or None) of the value at or after whitespace at pos."""
+        start = self.parser.WS_SKIP_RE.match(text, pos).end()
+        if text[start] not in '[{':
+            return start, self.parser.skim_value(text, start), None
+        ends = {}
+        end = self.parser.skim_value(text, start, ends)
+        return start, end, self.span_node(text, ends, start)
+
+    def span_node(self, text: str, ends: dict, pos: int) -> SpanNode:
+        """SpanNode of the container at pos and the ones inside it, with an explicit stack."""
+        root = []
+        # (children list of the parent, index there, start) per container left to index
+        stack = [(root, 0, pos)]
+        while stack:
+            children, i, pos = stack.pop()
+            members = self.parser.lazy_index(text, ends, pos)
+            node = SpanNode(
+                [key for key, _ in members] if text[pos] == '{' else None,
+                array('q', [start - pos for _, (start, _) in members]),
+                array('q', [end - start for _, (start, end) in members]),
+                [None] * len(members),
+            )
+            if children is root:
+                root.append(node)
+            else:
+                children[i] = node
+            stack.extend((node.children, j, start) for j, (_, (start, _)) in enumerate(members) if text[start] in '[{')
+        return root[0]
+
+    @staticmethod
+    def holds(node: SpanNode, start: int, end: int, offset: int, deleted: int) -> bool:
+        """Whether an edit falls within the scalar, or inside the brackets of the container, at start:end."""
+        if node is None:
+            return start <= offset and offset + deleted <= end
+        return start < offset and offset + deleted < end
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> object:
+        """Replace deleted characters at offset with inserted and return the new value."""
+        if offset < 0 or offset + deleted > len(self.text):
+            raise ValueError(f"edit outside the document: {offset}, {deleted}")
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        delta = len(inserted) - deleted
+
+        # Containers holding the edit inside their brackets, from the root down, as
+        # (node, start, end, index of the member holding the edit) and that member's span
+        path = []
+        node, start, end = self.root, self.start, self.end
+        if not self.holds(node, start, end, offset, deleted):
+            self.reset(text)
+            return self.value
+        while node is not None:
+            i = bisect_right(node.starts, offset - start) - 1
+            if i < 0:
+                break
+            child = node.children[i]
+            child_start = start + node.starts[i]
+            child_end = child_start + node.lengths[i]
+            if not self.holds(child, child_start, child_end, offset, deleted):
+                break
+            path.append((node, start, end, i))
+            node, start, end = child, child_start, child_end
+
+        while True:
+            try:
+                value = self.parser.parse_document(text[start:end + delta])
+                break
+            except ValueError:
+                if not path:
+                    self.reset(text)
+                    return self.value
+                node, start, end, _ = path.pop()
+
+        if not path:
+            spans = self.spans(text, start)
+            self.value, self.text = value, text
+            self.start, self.end, self.root = spans
+            return self.value
+        value_start, value_end, value_node = self.spans(text, start)
+
+        # The value goes into its container unless a later duplicate key hides it or an ancestor
+        container = self.value
+        for depth, (node, _, _, i) in enumerate(path):
+            if node.keys is None:
+                key = i
+            elif node.keys[i] in node.keys[i + 1:]:
+                break
+            else:
+                key = node.keys[i]
+            if depth == len(path) - 1:
+                container[key] = value
+            else:
+                container = container[key]
+        node, node_start, _, i = path[-1]
+        node.starts[i] = value_start - node_start
+        node.lengths[i] = value_end - value_start
+        node.children[i] = value_node
+
+        if delta:
+            shift = delta.__add__
+            for node, _, _, i in path[:-1]:
+                node.lengths[i] += delta
+            for node, _, _, i in path:
+                node.starts[i + 1:] = array('q', map(shift, node.starts[i + 1:]))
+        self.end += delta
+        self.text = text
+        return self.value
+
+
+class UnicodeEscapes(dict):
+    """\\u escapes of non-ASCII characters, as UTF-16 surrogate pairs outside the BMP, filled in on first use."""
+    def __missing__(self, c: str) -> str:
+        units = c.encode('utf-16-be', 'surrogatepass').hex()
+        escape = self[c] = '\\u' + '\\u'.join([units[i:i + 4] for i in range(0, len(units), 4)])
+        return escape
+
+
+class JSONEncoder():
+    """
+    Serializer matching the parser: strings are escaped with the same table decode_escapes reads,
+    and output for the same options is the same as json.dumps. Strings without anything to
+    escape, most of them, are written as they are after a single regex search. The others go
+    through one str.translate, and with ensure_ascii a regex over the non-ASCII runs.
+
+    separators defaults to (', ', ': '), or (',', ': ') with an indent. default is called for
+    objects that are not JSON types and returns something that is. NaN and infinities raise
+    ValueError, the parser does not read them back.
+    """
+    ESCAPES = {c: '\\' + e for e, c in JSONParser.SIMPLE_ESCAPES.items() if e != '/'}
+    TRANSLATION = {**{n: f'\\u{n:04x}' for n in range(0x20)}, **{ord(c): e for c, e in ESCAPES.items()}}
+    ESCAPE_RE = re.compile(r'["\\\x00-\x1f]')
+    # Complements of printable ASCII rather than ranges up to U+10FFFF, which take
+    # milliseconds each to compile
+    ESCAPE_ASCII_RE = re.compile(r'[^\x20\x21\x23-\x5b\x5d-\x7e]')
+    NON_ASCII_RE = re.compile(r'[^\x00-\x7e]+')
+    UNICODE_ESCAPES = UnicodeEscapes()
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, sort_keys: bool = False, indent=None, separators=None, ensure_ascii: bool = True,
+                 default=None):
+        self.sort_keys = sort_keys
+        if isinstance(indent, int):
+            indent = ' ' * indent
+        self.indent = indent
+        if separators is None:
+            separators = (', ', ': ') if indent is None else (',', ': ')
+        self.item_separator, self.key_separator = separators
+        self.ensure_ascii = ensure_ascii
+        self.escape_re = self.ESCAPE_ASCII_RE if ensure_ascii else self.ESCAPE_RE
+        self.default = default
+
+    def encode(self, o) -> str:
+        return ''.join(self.iterencode_pieces(o, 0, {}))
+
+    def iterencode(self, o) -> Generator[str]:
+        """The encoding of o in chunks of about CHUNK_SIZE characters, for writing to a file or socket."""
+        chunk = []
+        size = 0
+        for piece in self.iterencode_pieces(o, 0, {}):
+            chunk.append(piece)
+            size += len(piece)
+            if size >= self.CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk.clear()
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+
+    def encode_string(self, s: str) -> str:
+        if self.escape_re.search(s) is None:
+            return '"' + s + '"'
+        s = s.translate(self.TRANSLATION)
+        if self.ensure_ascii:
+            s = self.NON_ASCII_RE.sub(self.escape_non_ascii, s)
+        return '"' + s + '"'
+
+    def escape_non_ascii(self, match) -> str:
+        return ''.join(map(self.UNICODE_ESCAPES.__getitem__, match.group()))
+
+    def encode_scalar(self, o):
+        """Encoding of a str, number, bool or None, None for anything else."""
+        if isinstance(o, str):
+            return self.encode_string(o)
+        if o is None:
+            return 'null'
+        if o is True:
+            return 'true'
+        if o is False:
+            return 'false'
+        if isinstance(o, int):
+            return int.__repr__(o)
+        if isinstance(o, float):
+            if o != o or o in (float('inf'), float('-inf')):
+                raise ValueError(f"out of range float value {o!r}")
+            return float.__repr__(o)
+        return None
+
+    def encode_key(self, key) -> str:
+        if isinstance(key, str):
+            return self.encode_string(key)
+        if isinstance(key, (int, float)) or key is None:
+            # Same as json.dumps: the scalar encoding used as the key text
+            return '"' + self.encode_scalar(key) + '"'
+        raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+    def iterencode_pieces(self, o, level: int, markers: dict):
+        scalar = self.encode_scalar(o)
+        if scalar is not None:
+            yield scalar
+            return
+        if isinstance(o, (list, tuple, dict)):
+            if id(o) in markers:
+                raise ValueError("circular reference detected")
+            markers[id(o)] = o
+            if isinstance(o, dict):
+                yield from self.iterencode_dict(o, level, markers)
+            else:
+                yield from self.iterencode_list(o, level, markers)
+            del markers[id(o)]
+            return
+        if self.default is None:
+            raise TypeError(f"object of type {o.__class__.__name__} is not JSON serializable")
+        yield from self.iterencode_pieces(self.default(o), level, markers)
+
+    def separators(self, level: int):
+        """(text before the first item, text between items, text before the closing bracket)."""
+        if self.indent is None:
+            return '', self.item_separator, ''
+        newline = '\n' + self.indent * (level + 1)
+        return newline, self.item_separator + newline, '\n' + self.indent * level
+
+    def iterencode_list(self, o, level: int, markers: dict):
+        if not o:
+            yield '[]'
+            return
+        first, separator, last = self.separators(level)
+        yield '[' + first
+        encode_scalar = self.encode_scalar
+        for i, item in enumerate(o):
+            if i:
+                yield separator
+            scalar = encode_scalar(item)
+            if scalar is not None:
+                yield scalar
+            else:
+                yield from self.iterencode_pieces(item, level + 1, markers)
+        yield last + ']'
+
+    def iterencode_dict(self, o, level: int, markers: dict):
+        if not o:
+            yield '{}'
+            return
+        first, separator, last = self.separators(level)
+        yield '{' + first
+        items = sorted(o.items()) if self.sort_keys else o.items()
+        encode_scalar = self.encode_scalar
+        key_separator = self.key_separator
+        for i, (key, value) in enumerate(items):
+            if i:
+                yield separator
+            yield self.encode_key(key) + key_separator
+            scalar = encode_scalar(value)
+            if scalar is not None:
+                yield scalar
+            else:
+                yield from self.iterencode_pieces(value, level + 1, markers)
+        yield last + '}'
+
+
+def dumps(o, **options) -> str:
+    """Serialize o to a JSON str, options are those of JSONEncoder."""
+    return JSONEncoder(**options).encode(o)
+
+
+def dump(o, fp, **options):
+    """Serialize o to fp, anything with a write method such as a buffered file or socket.makefile('w'), in chunks."""
+    for chunk in JSONEncoder(**options).iterencode(o):
+        fp.write(chunk)
 
 
 if __name__ =="__main__":
@@ -453,16 +3335,24 @@ if __name__ =="__main__":
 
     # sys.argv.append('./everything_example.json')
 
-    if len(sys.argv) < 2:
-        print("Enter filename to parse")
-        sys.exit(1)
+    import argparse
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-    contents = []
-    with open(sys.argv[1]) as f:
-        contents = f.read()
-        #logger.debug(contents)
+    arg_parser = argparse.ArgumentParser(description="Parse a JSON file and print the value")
+    arg_parser.add_argument('filename')
+    arg_parser.add_argument('--jsonl', action='store_true', help="parse one JSON document per line")
+    arg_parser.add_argument('--workers', type=int, default=1, help="processes used with --jsonl")
+    args = arg_parser.parse_args()
+
+    if args.jsonl:
+        failed = False
+        for lineno, value in JSONParser().parse_lines(args.filename, workers=args.workers):
+            if isinstance(value, LineError):
+                failed = True
+                print(value, file=sys.stderr)
+            else:
+                print(value)
+        sys.exit(1 if failed else 0)
 
-    parsed_json_value = JSONParser().parse(contents)
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug(parsed_json_value)
+    parsed_json_value = JSONParser().parse_file(args.filename)
     print(parsed_json_value)
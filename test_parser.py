@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 
+import asyncio
+import glob
+import json
+import subprocess
+import sys
+import time
+import os
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest # type: ignore
 
-from parser import JSONParser
+from parser import Columns, IncrementalParser, JSONEncoder, JSONParser, LazyArray, LazyObject, LineError, ParseCache, Selector, Terminal, dump, dumps, materialize, parse_stream
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), 'examples')
 
 def test_string():
     json_example = """
@@ -143,3 +155,779 @@ def test_nesting():
     }
     """
     assert JSONParser().parse(json_example) == {"a": ["abc", True, False, None, 5, {"testing": "nesting"}, [1,2,3]]}
+
+def test_nested_array_first_elements():
+    json_example = """
+    [[1, 2], [true, null], [false]]
+    """
+    assert JSONParser().parse(json_example) == [[1, 2], [True, None], [False]]
+
+def test_token_lexer_tokens():
+    tokens = list(JSONParser().lexical_analysis('{"a": [12.5, true]}'))
+    assert tokens == [
+        (Terminal.CHAR, '{'),
+        (Terminal.VALUE_STRING, 'a'),
+        (Terminal.CHAR, ':'),
+        (Terminal.CHAR, ' '),
+        (Terminal.CHAR, '['),
+        (Terminal.VALUE_NUMBER, '12.5'),
+        (Terminal.CHAR, ','),
+        (Terminal.CHAR, ' '),
+        (Terminal.VALUE_BOOLEAN, True),
+        (Terminal.CHAR, ']'),
+        (Terminal.CHAR, '}'),
+        (Terminal.END, None),
+    ]
+
+def test_char_lexer_matches_token_lexer():
+    json_example = """
+    {
+        "a": ["abc", true, false, null, 5, {"testing": "nesting \\u8A12"}, [1,2,3]]
+    }
+    """
+    assert JSONParser(lexer='char').parse(json_example) == JSONParser(lexer='token').parse(json_example)
+
+def test_unknown_lexer():
+    with pytest.raises(ValueError):
+        JSONParser(lexer='bytes')
+
+def test_whitespace_around_separators():
+    json_example = '{"a":1 ,"b": [1 ,2 , 3 ] }'
+    assert JSONParser().parse(json_example) == {"a": 1, "b": [1, 2, 3]}
+    assert JSONParser(lexer='char').parse(json_example) == {"a": 1, "b": [1, 2, 3]}
+
+def test_compiled_driver_matches_table_driver():
+    json_example = """
+    {
+        "a": ["abc", true, false, null, -5.5e3, {"testing": "nesting \\u8A12"}, [1,2,3], [], {}]
+    }
+    """
+    assert JSONParser(driver='compiled').parse(json_example) == JSONParser(driver='table').parse(json_example)
+
+def test_compiled_driver_requires_token_lexer():
+    with pytest.raises(ValueError):
+        JSONParser(lexer='char', driver='compiled')
+
+def test_index_lexer():
+    documents = [open(path).read() for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json')))]
+    documents += ['"a\\\\"', '["a\\"b", "\\\\\\\\", "\\\\\\"x"]', '[1, -2.5e3, true, false, null, "\u00e9\\u00e9"]', ' [ ] ', '7']
+    parser = JSONParser(lexer='index')
+    for json_example in documents:
+        assert parser.parse(json_example) == json.loads(json_example)
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json'))):
+        with open(path) as f:
+            assert parser.parse_file(path) == json.load(f)
+    for bad in ['["a\nb"]', '[1x]', '[truex]', '["abc', '[1,]', '["\\q"]', '[\\]', '', '["\u00e9", tru]']:
+        with pytest.raises(json.JSONDecodeError) as expected:
+            JSONParser().parse(bad)
+        with pytest.raises(json.JSONDecodeError) as error:
+            parser.parse(bad)
+        assert (error.value.msg, error.value.pos) == (expected.value.msg, expected.value.pos)
+
+def test_index_lexer_numpy_blocks(monkeypatch):
+    pytest.importorskip('numpy')
+    import parser as parser_module
+    assert parser_module.load_numpy() is not None
+    documents = [open(path).read() for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json')))]
+    documents += ['"a\\\\"', '["a\\"b", "\\\\\\\\", "\\\\\\"x"]', '[1, -2.5e3, true, false, null, "\u00e9\\u00e9"]',
+                  '["\\\\\\\\\\\\", "\\"\\"\\"", {"k\\\\": ["\\\\", "}"]}, "\\u0041\\\\"]', ' [ ] ', '7']
+    bad = ['["a\nb"]', '["abc', '["\\q"]', '[\\]', '["\\\\\\"]', '[1x]']
+    parser = JSONParser(lexer='index')
+    # Blocks of a few bytes put backslash runs, quotes and strings across block boundaries
+    for block in [1, 2, 3, 5, 7, 1 << 20]:
+        monkeypatch.setattr(JSONParser, 'STRUCTURAL_INDEX_BLOCK', block)
+        for json_example in documents + bad:
+            data = json_example.encode()
+            positions, escapes, error = parser.numpy_structural_index(data)
+            expected_positions, expected_escapes, expected_error = parser.scan_structural_index(data)
+            # Stage 2 raises the error before reading any positions
+            assert error == expected_error
+            if error is None:
+                assert positions == expected_positions
+                # The scan only reports the first escape of each string
+                assert set(expected_escapes) <= set(escapes)
+        for json_example in documents:
+            assert parser.parse(json_example) == json.loads(json_example)
+        for json_example in bad:
+            with pytest.raises(json.JSONDecodeError) as expected:
+                JSONParser().parse(json_example)
+            with pytest.raises(json.JSONDecodeError) as error:
+                parser.parse(json_example)
+            assert (error.value.msg, error.value.pos) == (expected.value.msg, expected.value.pos)
+
+    monkeypatch.setattr(JSONParser, 'STRUCTURAL_INDEX_BLOCK', 5)
+    array = ('[' + ', '.join(['{"a": "x\\\\", "b": [1, "]\\""]}', '"\\\\,"', '[2, 3]', '4'] * 20) + ']  ').encode()
+    for parts in [1, 2, 3, 8, 40]:
+        points = list(parser.numpy_array_split_points(array, 0, parts))
+        monkeypatch.setattr(parser_module, 'load_numpy', lambda: None)
+        assert list(parser.array_split_points(array, 0, parts)) == points
+        monkeypatch.undo()
+        monkeypatch.setattr(JSONParser, 'STRUCTURAL_INDEX_BLOCK', 5)
+        assert points[-1] == len(array) - 3 and all(array[point] == ord(',') for point in points[:-1])
+
+def test_index_lexer_needs_compiled_driver():
+    with pytest.raises(ValueError):
+        JSONParser(lexer='index', driver='table')
+
+def test_compiled_driver_rejects_bad_input():
+    for json_example in ['[1,]', '{"a" 1}', '[1 2]', '{"a":1,}', '"abc" "def"', '']:
+        with pytest.raises(ValueError):
+            JSONParser(driver='compiled').parse(json_example)
+
+def test_parser_is_reusable():
+    parser = JSONParser()
+    assert parser.parse('{"a": [1, 2]}') == {"a": [1, 2]}
+    assert parser.parse('"again"') == "again"
+    with pytest.raises(ValueError):
+        parser.parse('[1,')
+    assert parser.parse('[true]') == [True]
+
+def test_reused_context():
+    for parser in [JSONParser(), JSONParser(driver='table'), JSONParser(lexer='char')]:
+        with parser.context() as context:
+            assert context.parse('[1, {"b": null}]') == [1, {"b": None}]
+            assert context.parse('{"c": "d"}') == {"c": "d"}
+        assert context.stack == [] and context.values_stack == []
+
+def test_shared_parser_across_threads():
+    documents = [open(path).read() for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json')))]
+    expected = [json.loads(document) for document in documents]
+    parser = JSONParser()
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(parser.parse, documents * 16))
+    assert results == expected * 16
+
+def test_escaped_surrogate_pair_and_solidus():
+    json_example = r'"smile \ud83d\ude00 a\/b \t"'
+    assert JSONParser().parse(json_example) == "smile \U0001F600 a/b \t"
+    assert JSONParser(lexer='char').parse(json_example) == "smile \U0001F600 a/b \t"
+
+def test_non_json_escapes_rejected():
+    for json_example in [r'"\x41"', r'"\101"', r'"\N{DASH}"', r'"\U0001F600"']:
+        with pytest.raises(ValueError):
+            JSONParser().parse(json_example)
+        with pytest.raises(ValueError):
+            JSONParser().decode_escapes(json_example[1:-1])
+
+def test_incremental_parser_chunk_boundaries():
+    documents = [open(path).read() for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json')))]
+    documents += [r'["tab\t 😀 訒", -12.5e+3, 0, true, false, null]']
+    parser = JSONParser().incremental()
+    for document in documents:
+        for size in [1, 2, 3, 7, 64]:
+            for i in range(0, len(document), size):
+                parser.feed(document[i:i + size])
+            assert parser.close() == json.loads(document)
+
+def test_incremental_parser_incomplete_input():
+    for json_example in ['[1,', '"abc', 'tru', '-', r'"\u12']:
+        parser = IncrementalParser()
+        parser.feed(json_example)
+        with pytest.raises(ValueError):
+            parser.close()
+
+def test_events():
+    json_example = '{"a": [1, "x\\n", {"b": null}], "c": {}, "d": [true, []]}'
+    assert list(JSONParser().events(json_example)) == [
+        ((), 'start_map', None),
+        ((), 'map_key', 'a'),
+        (('a',), 'start_array', None),
+        (('a', 0), 'number', 1),
+        (('a', 1), 'string', 'x\n'),
+        (('a', 2), 'start_map', None),
+        (('a', 2), 'map_key', 'b'),
+        (('a', 2, 'b'), 'null', None),
+        (('a', 2), 'end_map', None),
+        (('a',), 'end_array', None),
+        ((), 'map_key', 'c'),
+        (('c',), 'start_map', None),
+        (('c',), 'end_map', None),
+        ((), 'map_key', 'd'),
+        (('d',), 'start_array', None),
+        (('d', 0), 'boolean', True),
+        (('d', 1), 'start_array', None),
+        (('d', 1), 'end_array', None),
+        (('d',), 'end_array', None),
+        ((), 'end_map', None),
+    ]
+
+def test_events_from_chunks_and_files():
+    path = os.path.join(EXAMPLES, 'everything_example.json')
+    document = open(path).read()
+    expected = list(JSONParser().events(document))
+    with open(path) as f:
+        assert list(JSONParser().events(f)) == expected
+    assert list(JSONParser().events(document[i:i + 5] for i in range(0, len(document), 5))) == expected
+
+def test_events_bad_input():
+    with pytest.raises(ValueError):
+        list(JSONParser().events('[1, 2'))
+
+def test_select():
+    json_example = """
+    {
+        "items": [{"id": 1, "x": [1, {"a": "]\\"["}]}, {"id": 2, "x": "}"}, {"noid": 3}],
+        "meta": {"n": 3, "k\\u0041": true}
+    }
+    """
+    assert JSONParser().parse(json_example, select=['$.items[*].id', "$['meta'].kA", '$.items[1]', '$.*.n', '$.nope']) == {
+        '$.items[*].id': [1, 2],
+        "$['meta'].kA": [True],
+        '$.items[1]': [{"id": 2, "x": "}"}],
+        '$.*.n': [3],
+        '$.nope': [],
+    }
+    assert JSONParser().parse(json_example, select=['$'])['$'] == [JSONParser().parse(json_example)]
+
+def test_selector_steps():
+    assert Selector('$.a[0]["b.c"][*]').steps == ('a', 0, 'b.c', Selector.WILDCARD)
+    with pytest.raises(ValueError):
+        Selector('a.b')
+
+def test_select_skimmed_values_must_balance():
+    for json_example in ['[[1}, 2]', '[["a], 2]', '[[1], 2', '[1, 2] 3']:
+        with pytest.raises(ValueError):
+            JSONParser().parse(json_example, select=['$[1]'])
+
+def test_parse_file():
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json'))):
+        with open(path) as f:
+            assert JSONParser().parse_file(path) == json.load(f)
+
+def test_parse_file_bad_input(tmp_path):
+    for content in [b'', b'[1, tru]', b'"\xff"', b'[1,']:
+        path = tmp_path / 'bad.json'
+        path.write_bytes(content)
+        with pytest.raises(ValueError):
+            JSONParser().parse_file(path)
+        with pytest.raises(ValueError):
+            JSONParser(lexer='index').parse_file(path)
+
+def test_parse_parallel(tmp_path):
+    from parser import LimitError
+    path = tmp_path / 'array.json'
+    documents = [
+        json.dumps([{"id": n, "text": "a,b]\\\"}", "nested": [n, {"x": None}]} for n in range(300)]),
+        '[1, 2, 3, 4, 5, 6, 7, 8]', ' [ ] ', '{"a": [1, 2]}',
+    ]
+    for document in documents:
+        path.write_text(document)
+        assert JSONParser().parse_parallel(path, workers=2) == json.loads(document)
+    for bad in ['[1, 2,]', '[1,, 2]', '[1, 2] x', '[1, 2', '[1, {"a": tru}, 3]', '[1, 2, 3, 4, 5, 6, 7, 8, 9 10]']:
+        path.write_text(bad)
+        with pytest.raises(json.JSONDecodeError) as error:
+            JSONParser().parse_parallel(path, workers=3)
+        with pytest.raises(json.JSONDecodeError) as expected:
+            json.loads(bad)
+        assert (error.value.pos, error.value.colno) == (expected.value.pos, expected.value.colno)
+    # Same plain types for every worker count, a cache on the parser does not change that
+    path.write_text(documents[0])
+    for workers in [1, 2]:
+        value = JSONParser(cache=ParseCache()).parse_parallel(path, workers=workers)
+        assert type(value) is list and type(value[0]) is dict and type(value[0]["nested"]) is list
+    with pytest.raises(LimitError):
+        JSONParser(max_document_size=100).parse_parallel(path, workers=2)
+
+def test_leading_comma(tmp_path):
+    path = tmp_path / 'array.json'
+    for bad in ['[,1]', '[ , 1, 2]', '{"a": [,]}']:
+        path.write_text(bad)
+        parsers = [JSONParser(), JSONParser(driver='table'), JSONParser(lexer='char'), JSONParser(lexer='index')]
+        for parser in parsers:
+            with pytest.raises(json.JSONDecodeError):
+                parser.parse(bad)
+            with pytest.raises(json.JSONDecodeError):
+                parser.parse_file(path)
+        with pytest.raises(json.JSONDecodeError):
+            JSONParser().parse(bad, lazy=True).materialize()
+        with pytest.raises(json.JSONDecodeError):
+            JSONParser().parse(bad, select=['$.*', '$.a[*]'])
+        with pytest.raises(json.JSONDecodeError):
+            JSONParser().parse_parallel(path, workers=2)
+        with pytest.raises(json.JSONDecodeError):
+            list(JSONParser().parse_many([bad]))
+        incremental = JSONParser().incremental()
+        with pytest.raises(ValueError):
+            incremental.feed(bad)
+            incremental.close()
+
+def test_parse_lines(tmp_path):
+    lines = ['{"a": 1}', '[1, 2', '', '"x"', 'tru', '{"b": [true, null]}'] * 50
+    path = tmp_path / 'lines.jsonl'
+    path.write_text('\n'.join(lines) + '\n')
+    expected = list(JSONParser().parse_lines(lines))
+    assert [lineno for lineno, _ in expected] == [i + 1 for i, line in enumerate(lines) if line]
+    assert expected[:4] == [(1, {"a": 1}), expected[1], (4, "x"), expected[3]]
+    assert isinstance(expected[1][1], LineError) and expected[1][1].lineno == 2
+    assert str(expected[3][1]) == "line 5: got invalid input tru"
+
+    expected = [(lineno, str(value)) for lineno, value in expected]
+    for workers in [1, 2]:
+        for source in [path, iter(lines)]:
+            results = JSONParser().parse_lines(source, workers=workers, batch_size=7)
+            assert [(lineno, str(value)) for lineno, value in results] == expected
+    unordered = JSONParser().parse_lines(path, workers=2, ordered=False)
+    assert sorted((lineno, str(value)) for lineno, value in unordered) == expected
+
+    # A line that is not UTF-8 only fails itself
+    path.write_bytes(b'1\n"\xff"\n2\n')
+    for source in [path, [b'1', b'"\xff"', b'2']]:
+        results = list(JSONParser().parse_lines(source))
+        assert results[0] == (1, 1) and results[2] == (3, 2)
+        assert isinstance(results[1][1], LineError) and results[1][1].lineno == 2
+        assert "can't decode" in str(results[1][1])
+
+def test_parse_many():
+    documents = [open(path).read() for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json')))]
+    documents += ['1', ' "a\\n" ', '{"k": "\\u00e9", "k": [{}]}', '[]', 'null'] * 3
+    expected = [json.loads(document) for document in documents]
+    for parser in [JSONParser(), JSONParser(driver='table'), JSONParser(max_tokens=10 ** 6)]:
+        assert list(parser.parse_many(documents, batch_size=4)) == expected
+    for bad in ['', '1 2', '[1,', '{"a" 1}', '"\\x"', 'tru', '[[1]']:
+        values = JSONParser().parse_many(['7', '8', bad, '9'], batch_size=3)
+        assert [next(values), next(values)] == [7, 8]
+        with pytest.raises(ValueError) as error:
+            next(values)
+        with pytest.raises(ValueError) as expected_error:
+            JSONParser().parse(bad)
+        assert repr(error.value) == repr(expected_error.value)
+    with pytest.raises(ValueError):
+        list(JSONParser(max_document_size=3).parse_many(['1', '[1, 2]']))
+
+def test_import_is_light():
+    code = "import sys, parser; print(sorted({'asyncio', 'multiprocessing', 'numpy'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+def test_uppercase_exponent():
+    for parser in [JSONParser(), JSONParser(driver='table'), JSONParser(lexer='char')]:
+        assert parser.parse('[1E5, 1.5E-2, -2e+3]') == [1E5, 1.5E-2, -2e+3]
+
+def test_number_hooks():
+    json_example = '{"price": 10.10, "count": 3, "big": 1e400}'
+    expected = json.loads(json_example, parse_float=Decimal, parse_int=str)
+    for parser in [JSONParser(parse_float=Decimal, parse_int=str), JSONParser(driver='table', parse_float=Decimal, parse_int=str)]:
+        assert parser.parse(json_example) == expected
+    parser = JSONParser(parse_float=Decimal)
+    incremental = parser.incremental()
+    for c in json_example:
+        incremental.feed(c)
+    assert incremental.close() == json.loads(json_example, parse_float=Decimal)
+    assert list(parser.events('[0.1]'))[1] == ((0,), 'number', Decimal('0.1'))
+
+def test_objects_built_directly():
+    json_example = '{"a": {"b": [1, {"c": null}]}, "a": {"d": "\\u00e9"}, "e": []}'
+    for parser in [JSONParser(), JSONParser(driver='table'), JSONParser(lexer='char')]:
+        assert parser.parse(json_example) == json.loads(json_example)
+
+def test_object_keys_interned():
+    parser = JSONParser()
+    with parser.context() as context:
+        first = parser.parse('[{"name": 1}, {"name": 2}]', context=context)
+        second = parser.parse('{"name": 3}', context=context)
+    keys = [next(iter(record)) for record in first + [second]]
+    assert keys[0] is keys[1] is keys[2]
+
+def test_object_keys_interned_bounded():
+    from parser import ParseContext, Schema, Trace
+    json_example = json.dumps({f"key{n}": n for n in range(ParseContext.MAX_KEYS + 100)})
+    for parser, options in [(JSONParser(), {}), (JSONParser(trace=Trace()), {}),
+                            (JSONParser(), {'schema': Schema({"type": "object"})})]:
+        with parser.context() as context:
+            assert len(parser.parse(json_example, context=context, **options)) == ParseContext.MAX_KEYS + 100
+            assert len(context.keys) <= ParseContext.MAX_KEYS
+
+def test_object_pairs_hook():
+    json_example = '{"b": 1, "a": {"x": [{}]}, "b": 2}'
+    expected = json.loads(json_example, object_pairs_hook=list)
+    for parser in [JSONParser(object_pairs_hook=list), JSONParser(driver='table', object_pairs_hook=list)]:
+        assert parser.parse(json_example) == expected
+    incremental = JSONParser(object_pairs_hook=list).incremental()
+    incremental.feed(json_example)
+    assert incremental.close() == expected
+
+def test_columnar():
+    json_example = '{"rows": [{"ts": 1, "v": 0.5, "ok": true, "tag": "a"}, {"ts": 2, "v": 3, "ok": false, "tag": null}], "ids": [1, 2]}'
+    for parser in [JSONParser(), JSONParser(driver='table')]:
+        value = parser.parse(json_example, columnar=True)
+        rows = value["rows"]
+        assert isinstance(rows, Columns) and len(rows) == 2 and rows.keys == ("ts", "v", "ok", "tag")
+        assert list(rows["ts"]) == [1, 2] and list(rows["v"]) == [0.5, 3.0]
+        assert rows["ok"] == [True, False] and rows["tag"] == ["a", None]
+        assert rows.records() == json.loads(json_example)["rows"]
+        assert value["ids"] == [1, 2]
+
+def test_columnar_shape_mismatch():
+    for json_example in ['[{"a": 1}, {"b": 1}]', '[{"a": 1}, 2]', '[1, {"a": 1}]', '[{}, {}]', '[]',
+                         '[{"a": 1}, {"a": 99999999999999999999}]', '[{"a": [1]}, {"a": 1.5}]',
+                         '[{"a": 9007199254740993}, {"a": 1.5}]', '[{"a": 1.5}, {"a": 9007199254740993}]',
+                         '[{"a": 1.5}, {"a": 99999999999999999999}]']:
+        value = JSONParser().parse(json_example, columnar=True)
+        if isinstance(value, Columns):
+            value = value.records()
+        assert value == json.loads(json_example)
+
+def test_limits():
+    from parser import LimitError
+    cases = [
+        ({'max_depth': 3}, '[[{"a": [1]}]]', '[[{"a": 1}], [[]]]'),
+        ({'max_string_length': 3}, '["abcd"]', '{"abc": "a\\n"}'),
+        ({'max_document_size': 10}, '[1, 2, 3, 4]', '[1,2,3,4]'),
+        ({'max_tokens': 5}, '[1, 2, 3]', '[[]]'),
+    ]
+    for limits, too_big, fits in cases:
+        for parser in [JSONParser(**limits), JSONParser(driver='table', **limits)]:
+            with pytest.raises(LimitError) as e:
+                parser.parse(too_big)
+            assert e.value.limit == next(iter(limits))
+            assert parser.parse(fits) == json.loads(fits)
+        incremental = JSONParser(**limits).incremental()
+        with pytest.raises(LimitError):
+            for c in too_big:
+                incremental.feed(c)
+            incremental.close()
+
+def test_stack_proportional_to_depth():
+    incremental = JSONParser().incremental()
+    incremental.feed('[ {"a" : ' * 100)
+    assert len(incremental.context.stack) <= 5 * 200
+    assert len(incremental.context.values_stack) <= 3 * 100
+
+def test_decode_error_positions(tmp_path):
+    from parser import JSONDecodeError
+    import pickle
+    for bad in ['{"a": [1,\n  2 3]}', '[1, 2', '{"a" 1}', '\n\n  [1, @]', '[1, ]']:
+        with pytest.raises(json.JSONDecodeError) as expected:
+            json.loads(bad)
+        for parser in [JSONParser(), JSONParser(driver='table'), JSONParser(lexer='char')]:
+            with pytest.raises(JSONDecodeError) as e:
+                parser.parse(bad)
+            assert (e.value.pos, e.value.lineno, e.value.colno) == (expected.value.pos, expected.value.lineno, expected.value.colno)
+        path = tmp_path / 'bad.json'
+        path.write_text(bad)
+        with pytest.raises(JSONDecodeError) as e:
+            JSONParser().parse_file(path)
+        assert (e.value.pos, e.value.lineno, e.value.colno) == (expected.value.pos, expected.value.lineno, expected.value.colno)
+
+    with pytest.raises(JSONDecodeError) as e:
+        JSONParser().parse('{"a": [1,\n  2 3]}')
+    assert e.value.expected == ("','", "']'")
+    assert e.value.snippet == '  2 3]}\n    ^'
+    assert str(pickle.loads(pickle.dumps(e.value))) == str(e.value) == "unexpected number, expected ',' or ']': line 2 column 5 (char 14)"
+    with pytest.raises(JSONDecodeError) as e:
+        JSONParser().parse('{"a": [1, 2 3]}', select=['$.a'])
+    assert e.value.pos == 12
+
+def test_trace():
+    from parser import Trace
+    json_example = '{"a": [1, "x\\n", {"b": null}], "c": true}'
+    trace = Trace()
+    parser = JSONParser(trace=trace)
+    assert parser.parse(json_example) == json.loads(json_example)
+    incremental = parser.incremental()
+    incremental.feed(json_example[:10])
+    incremental.feed(json_example[10:])
+    assert incremental.close() == json.loads(json_example)
+    counters = trace.as_dict()
+    assert counters['documents'] == 2 and counters['tokens'] == 2 * 20
+    assert counters['values'] == 2 * 7
+    assert counters['expansions']['VALUE'] == 2 * 7 and counters['expansions']['MEMBER'] == 2 * 3
+    assert counters['lex_seconds'] > 0 and counters['parse_seconds'] > 0
+    with pytest.raises(ValueError):
+        JSONParser(driver='table', trace=trace)
+
+def test_import_leaves_logging_alone():
+    import subprocess
+    import sys
+    code = "import logging, parser; print(logging.getLogger().handlers, logging.getLogger('parser').level)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[] 0'
+
+def test_dumps_round_trip(tmp_path):
+    parser = JSONParser()
+    for path in sorted(glob.glob(os.path.join(EXAMPLES, '*.json'))):
+        value = parser.parse(open(path).read())
+        for options in [{}, {'indent': 2, 'sort_keys': True}, {'separators': (',', ':'), 'ensure_ascii': False}]:
+            encoded = dumps(value, **options)
+            assert encoded == json.dumps(value, **options)
+            assert parser.parse(encoded) == value
+        out = tmp_path / 'out.json'
+        with open(out, 'w') as f:
+            dump(value, f, indent='\t')
+        assert parser.parse_file(out) == value
+
+def test_dumps_escapes_and_errors():
+    value = ['"\\/\b\f\n\r\t\x00\x1f\x7f', '\u00e9\U0001f600\ud800', {1: None, 2.5: 1.5}]
+    assert dumps(value) == json.dumps(value)
+    assert dumps({True: 1.5}) == '{"true": 1.5}'
+    assert JSONParser().parse(dumps(value)) == json.loads(json.dumps(value))
+    encoder = JSONEncoder()
+    encoder.CHUNK_SIZE = 10
+    chunks = list(encoder.iterencode([value] * 10))
+    assert len(chunks) > 1 and ''.join(chunks) == json.dumps([value] * 10)
+    assert dumps({'d': Decimal('1.5')}, default=str) == '{"d": "1.5"}'
+    circular = []
+    circular.append(circular)
+    for bad, error in [(float('nan'), ValueError), (circular, ValueError), (object(), TypeError), ({(1,): 1}, TypeError)]:
+        with pytest.raises(error):
+            dumps(bad)
+
+def test_parse_cache():
+    from parser import ParseCache
+    from types import MappingProxyType
+    cache = ParseCache(max_entries=2)
+    parser = JSONParser(cache=cache)
+    first = parser.parse('{"a": [1, {"b": 2}]}')
+    assert isinstance(first, MappingProxyType) and first['a'] == (1, {"b": 2})
+    with pytest.raises(TypeError):
+        first['a'] = 1
+    assert parser.parse('{"a": [1, {"b": 2}]}') is first
+    parser.parse('[1]')
+    parser.parse('[2]')
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'evictions': 1, 'entries': 2, 'bytes': cache.size}
+    assert parser.parse('{"a": [1, {"b": 2}]}') is not first
+    assert parser.parse('{"a": 1}', select=['$.a']) == {'$.a': [1]}
+    assert isinstance(parser.parse('[{"a": 1}]', columnar=True), Columns)
+    assert cache.stats()['misses'] == 4
+
+    copies = ParseCache(frozen=False)
+    parser = JSONParser(cache=copies)
+    value = parser.parse('{"a": [1]}')
+    value['a'].append(2)
+    assert parser.parse('{"a": [1]}') == {"a": [1]}
+    assert copies.stats()['hits'] == 1
+
+    small = ParseCache(max_bytes=1000)
+    parser = JSONParser(cache=small)
+    parser.parse('[' + ', '.join(['"x"'] * 100) + ']')
+    parser.parse('[1]')
+    assert small.stats()['entries'] == 1 and small.stats()['bytes'] <= 1000
+
+    # Freezing, copying and sizing are not limited by the recursion limit
+    for frozen in [True, False]:
+        parser = JSONParser(cache=ParseCache(frozen=frozen))
+        for json_example in ['[' * 3000 + ']' * 3000, '{"a": ' * 3000 + '[1, {}]' + '}' * 3000]:
+            parser.parse(json_example)
+            value = parser.parse(json_example)
+            for _ in range(3000):
+                value = value['a'] if 'a' in value else value[0] if value else value
+            assert value in ([], (), [1, {}], (1, {}))
+
+def test_parse_cache_workers(tmp_path):
+    lines = ['{"a": [1, {"b": 2}]}', 'tru', '[1, 2]'] * 10
+    path = tmp_path / 'lines.jsonl'
+    path.write_text('\n'.join(lines) + '\n')
+    expected = [(lineno, str(value)) for lineno, value in JSONParser().parse_lines(path)]
+    for workers in [1, 2]:
+        results = list(JSONParser(cache=ParseCache()).parse_lines(path, workers=workers))
+        assert [(lineno, str(value)) for lineno, value in results] == expected
+        assert type(results[0][1]) is dict
+    path.write_text(json.dumps([{"a": [n]} for n in range(100)]))
+    for workers in [1, 2]:
+        assert JSONParser(cache=ParseCache()).parse_parallel(path, workers=workers) == [{"a": [n]} for n in range(100)]
+
+
+def test_lazy():
+    parser = JSONParser()
+    for path in glob.glob(os.path.join(EXAMPLES, '*.json')):
+        raw = open(path).read()
+        assert parser.parse(raw, lazy=True) == json.loads(raw)
+    value = parser.parse('{"a": [1, 2.5, {"b": "x\\n"}], "c": {}, "a": [true, null]}', lazy=True)
+    assert isinstance(value, LazyObject) and value.spans is None
+    assert isinstance(value['a'], LazyArray) and value['a'] is value['a']
+    assert value['a'][-1] is None and value['a'][:1] == [True]
+    assert len(value) == 2 and value['c'] == {}
+    assert value.materialize() == {"a": [True, None], "c": {}}
+    assert parser.parse(' "\\u00e9" ', lazy=True) == "\u00e9"
+    for raw in ['', '[1] x', '[1}', '["a\nb"]']:
+        with pytest.raises(json.JSONDecodeError):
+            parser.parse(raw, lazy=True)
+    for raw in ['{"a" 1}', '[1,]', '[1 2]']:
+        with pytest.raises(json.JSONDecodeError):
+            len(parser.parse(raw, lazy=True))
+    value = parser.parse('{"a": 1, "b": [2, "x", 2]}', lazy=True)
+    assert list(value.keys()) == ['a', 'b'] and list(value.values())[0] == 1
+    assert [(key, materialize(item)) for key, item in value.items()] == [('a', 1), ('b', [2, "x", 2])]
+    array = value['b']
+    assert array.index("x") == 1 and array.count(2) == 2 and array[-3] == 2
+    for i in [3, -4, -5]:
+        with pytest.raises(IndexError):
+            array[i]
+    deep = parser.parse('[' * 3000 + '{"a": []}' + ']' * 3000, lazy=True).materialize()
+    for _ in range(3000):
+        assert type(deep) is list
+        deep, = deep
+    assert deep == {"a": []} and type(deep) is dict and type(deep["a"]) is list
+    broken = parser.parse('{"a": [1, tru], "b": 2}', lazy=True)
+    assert broken['b'] == 2
+    with pytest.raises(json.JSONDecodeError):
+        broken['a'][0]
+
+
+def test_editable():
+    parser = JSONParser()
+    raw = json.dumps({"a": [1, 2.5, {"b": "x\u00e9", "c": [True, None]}], "d": {"e": -3, "f": []}}, indent=1)
+    document = parser.editable(raw)
+    # Each edit starts right after its anchor
+    edits = [
+        ('"e": ', 2, '7'), ('"e": ', 1, '[4, {"g": 5}]'), ('2', 2, ''), ('"f": [', 0, '"x"'), ('true,\n    ', 4, '{}'),
+        ('"c"', 0, ' '), ('{}', 0, ', 8'), ('"g": 5', 0, '}, {"h": 6'), ('"b', 0, 'B'), ('"', 1, 'A'),
+    ]
+    for anchor, deleted, inserted in edits:
+        offset = document.text.index(anchor) + len(anchor)
+        expected = document.text[:offset] + inserted + document.text[offset + deleted:]
+        value = document.value
+        assert document.edit(offset, deleted, inserted) == json.loads(expected)
+        assert document.text == expected
+        # Only an edit to the root object's own keys builds a new result
+        assert (document.value is value) == (anchor != '"')
+        fresh = parser.editable(expected)
+        assert (document.start, document.end) == (fresh.start, fresh.end)
+        nodes = [(document.root, fresh.root)]
+        while nodes:
+            node, other = nodes.pop()
+            assert (node.keys, node.starts, node.lengths) == (other.keys, other.starts, other.lengths)
+            nodes.extend(pair for pair in zip(node.children, other.children) if pair[0] is not None)
+    text, value = document.text, json.loads(document.text)
+    for offset, deleted, inserted in [(text.index('4'), 1, '4 4'), (0, 1, ''), (len(text), 0, ',')]:
+        with pytest.raises(json.JSONDecodeError):
+            document.edit(offset, deleted, inserted)
+        assert document.text == text and document.value == value
+    root = parser.editable('[\n false\n]')
+    with pytest.raises(ValueError):
+        root.edit(3, 0, ',')
+    assert root.text == '[\n false\n]' and root.value == [False]
+    deep = parser.editable('[' * 3000 + ']' * 3000)
+    value = deep.edit(3000, 0, '1')
+    for _ in range(2999):
+        value, = value
+    assert value == [1] and deep.text == '[' * 3000 + '1' + ']' * 3000
+    assert list(deep.root.lengths) == [len(deep.text) - 2]
+    duplicates = parser.editable('{"a": {"b": 1}, "a": {"b": 2}}')
+    assert duplicates.edit(12, 1, '5') == {"a": {"b": 2}}
+    assert duplicates.edit(27, 1, '7') == {"a": {"b": 7}}
+    assert parser.editable(' 1 ').edit(1, 1, '"x"') == "x"
+    with pytest.raises(ValueError):
+        JSONParser(object_pairs_hook=list).editable('{}')
+
+
+def test_parse_stream_event_loop_lag():
+    document = [{"id": n, "name": f"caf\u00e9 {n}", "tags": ["a", "b"], "score": n / 3} for n in range(8000)]
+    body = json.dumps(document).encode()
+
+    async def serve(**options):
+        results = []
+
+        async def handle(reader, writer):
+            try:
+                results.append(await parse_stream(reader, chunk_size=4096, **options))
+            except ValueError as e:
+                results.append(e)
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        lag = 0
+        done = False
+
+        async def ticker():
+            nonlocal lag
+            while not done:
+                start = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lag = max(lag, time.perf_counter() - start - 0.001)
+
+        tick = asyncio.create_task(ticker())
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        start = time.perf_counter()
+        writer.write(body)
+        writer.write_eof()
+        await reader.read()
+        elapsed = time.perf_counter() - start
+        done = True
+        await tick
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return results[0], lag, elapsed
+
+    value, lag, elapsed = asyncio.run(serve())
+    assert value == document
+    assert lag < elapsed / 4
+    value, lag, elapsed = asyncio.run(serve(offload_size=1 << 16))
+    assert value == document
+    value, _, _ = asyncio.run(serve(offload_size=len(body) + 1))
+    assert value == document
+    body = b'[1, "\xc3\xa9", {"a": tru}]'
+    assert isinstance(asyncio.run(serve())[0], ValueError)
+
+
+def test_schema():
+    from parser import Schema, SchemaError
+    with open(os.path.join(EXAMPLES, 'json_schema.json')) as f:
+        schema = Schema(json.load(f))
+    vehicle = {"nc:Vehicle": {"nc:VehicleAxleQuantity": 2,
+                              "nc:VehicleIdentification": [{"nc:IdentificationID": "ABC 123"}],
+                              "nc:VehicleMSRPAmount": {"nc:Amount": 25000.5, "nc:Currency": "EUR"},
+                              "ism:classification": "U"}}
+    parser = JSONParser()
+    assert parser.parse(json.dumps(vehicle), schema=schema) == vehicle
+    for bad in [{"nc:Vehicle": {"nc:VehicleMSRPAmount": {"nc:Currency": "JPY"}}},
+                {"nc:Vehicle": {"nc:VehicleAxleQuantity": "two"}},
+                {"nc:Vehicle": {"ism:classification": 1}}]:
+        with pytest.raises(SchemaError) as error:
+            parser.parse(json.dumps(bad), schema=schema)
+        assert error.value.path == ('nc:Vehicle',)
+    # Fails on the key, before the invalid rest of the document is reached
+    with pytest.raises(SchemaError) as error:
+        parser.parse('{"nc:Vehicle": {}, "unknown": [1, 2, tru', schema=schema)
+    assert str(error.value) == "property 'unknown' is not allowed at $"
+
+    schema = Schema({
+        "type": "object",
+        "required": ["id", "tags"],
+        "additionalProperties": False,
+        "properties": {
+            "id": {"type": "integer", "minimum": 1, "exclusiveMaximum": 100},
+            "name": {"type": "string", "pattern": "^[a-z]+$", "maxLength": 5},
+            "kind": {"enum": ["a", 1, None]},
+            "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+            "ref": {"$ref": "#/properties/id"},
+        },
+    })
+    valid = {"id": 1, "name": "abc", "kind": 1.0, "tags": ["x\\n"], "ref": 99}
+    assert parser.parse(json.dumps(valid), schema=schema) == valid
+    invalid = [
+        ({"id": 0, "tags": []}, ('id',)), ({"id": 100, "tags": []}, ('id',)), ({"id": 1.5, "tags": []}, ('id',)),
+        ({"id": 1, "tags": [], "name": "ABC"}, ('name',)), ({"id": 1, "tags": [], "name": "abcdef"}, ('name',)),
+        ({"id": 1, "tags": [], "kind": True}, ('kind',)), ({"id": 1, "tags": ["a", 2]}, ('tags', 1)),
+        ({"id": 1, "tags": ["a", "b", "c"]}, ('tags',)), ({"id": 1}, ()), ({"id": 1, "tags": {}}, ('tags',)),
+        ({"id": 1, "tags": [], "ref": 0}, ('ref',)), ({"id": 1, "tags": [], "other": 1}, ()), ([], ()),
+    ]
+    for document, path in invalid:
+        with pytest.raises(SchemaError) as error:
+            parser.parse(json.dumps(document), schema=schema)
+        assert error.value.path == path
+        with pytest.raises(SchemaError):
+            schema.validate(document)
+    assert JSONParser(lexer='index').parse('{"id": 5, "tags": []}', schema=schema) == {"id": 5, "tags": []}
+    with pytest.raises(SchemaError):
+        parser.parse('"x"', schema=Schema({"type": "number"}))
+    # enum and const compare members and elements by JSON type too
+    pairs = Schema({"type": "array", "items": {"enum": [[1, 1], {"a": [0.0]}]}})
+    assert parser.parse('[[1, 1.0], {"a": [0]}]', schema=pairs) == [[1, 1], {"a": [0]}]
+    for bad in ['[[1, true]]', '[{"a": [false]}]', '[{"a": [0], "b": 1}]', '[[1]]']:
+        with pytest.raises(SchemaError):
+            parser.parse(bad, schema=pairs)
+        with pytest.raises(SchemaError):
+            pairs.validate(json.loads(bad))
+    with pytest.raises(SchemaError):
+        Schema({"const": {"a": 1}}).validate({"a": True})
+    # Members are checked as they are read, a failing duplicate rejects the document
+    integer = Schema({"properties": {"a": {"type": "integer"}}})
+    with pytest.raises(SchemaError):
+        parser.parse('{"a": "x", "a": 1}', schema=integer)
+    integer.validate(parser.parse('{"a": "x", "a": 1}'))
+    with pytest.raises(ValueError):
+        JSONParser(driver='table').parse('1', schema=schema)